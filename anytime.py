@@ -0,0 +1,279 @@
+"""
+Search budgets, partial results and checkpoints.
+
+A budget limits the number of search nodes and/or the wall-clock time (in seconds) of a call of
+gi.count_isomorphism, gi.automorphism_order, gi.generate_automorphisms or gi.count_automorphisms
+with argument <budget>. When it runs out, the search stops and keeps its frontier in the budget:
+the subtrees that have not been searched yet, each as a pair (d, i) of lists of the indices (in
+the vertex lists) of the vertices of both graphs that are individualized on the path to it, like
+the subproblems of parallel.py. The partial results are kept in the budget as well:
+ count: the number of isomorphisms found so far, a lower bound in exhaustive mode,
+ generators: the automorphisms found so far, as mappings of labels; lower_bound() is the order
+     of the group that they generate, a lower bound for the order of the automorphism group.
+The functions of gi.py return None instead of the number of isomorphisms if the budget runs out
+before it is known (with stop_early: before an isomorphism is found), and the lower bound instead
+of the order of the automorphism group.
+
+Calling the same function on the same graphs with the budget again (after renew) continues the
+search from its frontier, and save and load write the frontier and the partial results to a file
+and read them back, so that a later run can continue the search. A budget belongs to one search:
+the frontier of a search that has not finished cannot be continued by another kind of search.
+Without stop_early or exhaustive, count_isomorphism first searches for one isomorphism and then
+for the automorphisms of g, and a budget that ran out in the second search continues with it.
+
+Forests are solved without charging the budget (see trees.py). Graphs that are split into smaller
+graphs are solved by searches of these graphs instead, which are charged to the budget: the
+colored cores of pendant.py, the quotient graphs of the prime nodes of modules.py, the parts of
+components.py and the reduced graphs of twins.py. A search of a graph that is one of several
+parts is done with part, which keeps its result in the budget when it has finished, so only the
+part whose search ran out is continued, from the frontier. The canonical labellings of canon.py
+that the parts are sorted by (and that key the prime nodes of modules.py) are parts as well, but
+their searches cannot be continued from a frontier: when one of them runs out, the next call
+computes it again from the start without a limit, so that every call makes progress.
+
+The clock of the time limit starts when one of these functions is entered (see budget.start),
+so the time limit covers everything they do, not only the search nodes.
+"""
+
+import hashlib
+import json
+import time
+
+import gi
+import permgrputil
+from permv2 import permutation
+from partition import adjacency
+
+
+class budget():
+    """
+    A limit on the number of search nodes <nodes> and the wall-clock time <seconds> of a search
+    (None for no limit), and the frontier and partial results of that search. <used> is the number
+    of nodes charged since the last renew, and <exhausted> tells whether the budget ran out.
+    <parts> holds the results of the searches of parts that have finished, and <pending> the key
+    of the part that cannot be resumed whose search ran out last, see part.
+    """
+
+    def __init__(self, nodes=None, seconds=None):
+        self.nodes = nodes
+        self.seconds = seconds
+        self.used = 0
+        self.deadline = None
+        self.exhausted = False
+        self.kind = None
+        self.frontier = None  # None before the search starts, [] after it has finished
+        self.count = 0
+        self.generators = []
+        self.parts = {}
+        self.pending = None
+        self._rest = None
+
+    def renew(self, nodes=None, seconds=None):
+        """
+        Sets new limits, keeping the frontier and the partial results.
+        """
+        self.nodes = nodes
+        self.seconds = seconds
+        self.used = 0
+        self.deadline = None
+        self.exhausted = False
+
+    def start(self):
+        """
+        Starts the clock of the time limit, unless it runs already since the last renew.
+        """
+        if self.seconds is not None and self.deadline is None:
+            self.deadline = time.time() + self.seconds
+
+    def finished(self):
+        """
+        Returns True iff the search of this budget has finished, so its results are exact.
+        """
+        return self.frontier is not None and len(self.frontier) == 0
+
+    def lower_bound(self):
+        """
+        Returns the order of the group generated by the automorphisms found so far.
+        """
+        return permgrputil.order([permutation(len(m), mapping=m) for m in self.generators])
+
+    def spend(self):
+        """
+        Charges one search node, returns True iff the budget has run out.
+        """
+        self.used += 1
+        if self.nodes is not None and self.used > self.nodes:
+            self.exhausted = True
+        elif self.deadline is not None and time.time() > self.deadline:
+            self.exhausted = True
+        return self.exhausted
+
+    def stop(self, rest):
+        """
+        Called by a search that ran out of budget, with the subtrees <rest> that it did not finish,
+        as lists of pairs of vertex numbers in its partition, see gi._frontier.
+        """
+        self._rest = rest
+
+    def save(self, path):
+        """
+        Writes the frontier and the partial results to the file <path>.
+        """
+        with open(path, 'w') as f:
+            json.dump({'kind': self.kind, 'frontier': self.frontier, 'count': self.count,
+                       'generators': self.generators, 'parts': self.parts, 'pending': self.pending}, f)
+
+    @classmethod
+    def load(cls, path, nodes=None, seconds=None):
+        """
+        Returns a budget with limits <nodes> and <seconds>, with the frontier and the partial
+        results in the file <path> that was written by save.
+        """
+        with open(path) as f:
+            state = json.load(f)
+        b = cls(nodes, seconds)
+        b.kind = state['kind']
+        b.frontier = None if state['frontier'] is None else [(d, i) for d, i in state['frontier']]
+        b.count = state['count']
+        b.generators = state['generators']
+        b.parts = state['parts']
+        b.pending = state['pending']
+        return b
+
+
+def part(b, kind, graph, search, default=None, resumable=True):
+    """
+    Returns search(b), the result of the search <kind> (e.g. 'order' or 'generators') of <graph>,
+    which is one of several parts of the search of budget <b>. When it has finished, the result
+    is kept in b.parts under a hash of <kind> and the labels, colornums and edges of <graph>, and
+    the frontier of <b> is cleared for the next part; calling part again for the same search
+    returns the kept result without searching. If <b> has run out before, <default> is returned
+    without searching, and if it runs out during the search, the partial result is returned.
+    If <resumable> is False, the search keeps no frontier, and if it runs out, the next call of
+    part for it returns search(None), which searches without a limit.
+    Without a budget (<b> is None), this is just search(None).
+    """
+    if b is None:
+        return search(None)
+    index, nbs = adjacency(graph)
+    key = (kind, [v._label for v in graph._V], [v.colornum for v in graph._V], [list(l) for l in nbs])
+    key = hashlib.sha1(repr(key).encode()).hexdigest()
+    if key in b.parts:
+        return b.parts[key]
+    if b.exhausted:
+        return default
+
+    if not resumable and b.pending == key:
+        result = search(None)
+        b.pending = None
+    else:
+        result = search(b)
+    if b.exhausted:
+        if not resumable:
+            b.pending = key
+    else:
+        b.parts[key] = result
+        b.kind = None
+        b.frontier = []
+        b.count = 0
+        b.generators = []
+    return result
+
+
+def _begin(b, kind, d, i):
+    """
+    Starts or continues the search <kind> of budget <b> at the subtree (d, i), and starts its
+    clock. Returns the frontier.
+    """
+    if b.kind != kind:
+        if b.frontier is not None and len(b.frontier) > 0:
+            raise ValueError('the budget holds the frontier of another search: ' + b.kind)
+        b.frontier = None
+    if b.frontier is None:
+        b.kind = kind
+        b.frontier = [(d, i)]
+        b.count = 0
+        b.generators = []
+    b.start()
+    return b.frontier
+
+
+def _indices(graph, vertices):
+    index = {}
+    for v in graph._V:
+        index[v] = len(index)
+    return [index[v] for v in vertices]
+
+
+def _expand(d, i, n, rest):
+    """
+    Returns the subtrees <rest> that a search of subtree (d, i) did not finish as subtrees of the
+    whole search, see budget.stop.
+    """
+    return [(d + [x for x, y in pairs], i + [y - n for x, y in pairs]) for pairs in rest]
+
+
+def count_isomorphism(g, h, d, i, stop_early, refine, selector, exhaustive, b):
+    """
+    gi.count_isomorphism with budget <b>.
+    """
+    if d is None:
+        d = []
+    if i is None:
+        i = []
+    if not stop_early and not exhaustive:
+        if b.kind != 'automorphisms':
+            found = count_isomorphism(g, h, d, i, True, refine, selector, False, b)
+            if found != 1:
+                return found
+        order = gi.automorphism_order(g, d, refine, selector, budget=b)
+        return None if b.exhausted else order
+
+    kind = 'isomorphism' if stop_early else 'isomorphisms'
+    frontier = _begin(b, kind, _indices(g, d), _indices(h, i))
+    if gi.signature(g) != gi.signature(h):
+        frontier = []
+
+    strategy = gi.get_strategy(refine, g, h)
+    select, name = gi.get_selector(selector)
+    while len(frontier) > 0 and not (stop_early and b.count > 0):
+        sd, si = frontier[0]
+        p, n, index = gi._initial_partition(g, h, [g._V[k] for k in sd], [h._V[k] for k in si], strategy)
+        if p is not None:
+            b.count += gi._count_isomorphisms(p, n, stop_early, strategy, select, name, b)
+            if b.exhausted:
+                frontier = _expand(sd, si, n, b._rest) + frontier[1:]
+                break
+        frontier = frontier[1:]
+
+    if stop_early and b.count > 0:
+        frontier = []
+    b.frontier = frontier
+    return None if b.exhausted else b.count
+
+
+def generate_automorphisms(graph, gCopy, verticesD, verticesI, x, firstPruningRule, secondPruningRule, membershipTesting, refine, selector, orbitPruning, b):
+    """
+    gi.generate_automorphisms with budget <b>. The generators found by earlier calls with <b> are
+    added to x first, so that they are used for pruning.
+    """
+    frontier = _begin(b, 'automorphisms', _indices(graph, verticesD), _indices(gCopy, verticesI))
+    known = set(tuple(perm.P) for perm in x)
+    for mapping in b.generators:
+        if tuple(mapping) not in known:
+            x.append(permutation(len(mapping), mapping=mapping))
+
+    n = len(graph._V)
+    result = False
+    while len(frontier) > 0:
+        sd, si = frontier[0]
+        if gi._search_automorphisms(graph, gCopy, [graph._V[k] for k in sd], [gCopy._V[k] for k in si], x, firstPruningRule, secondPruningRule, membershipTesting, refine, selector, orbitPruning, b):
+            result = True
+        if b.exhausted:
+            frontier = _expand(sd, si, n, b._rest) + frontier[1:]
+            break
+        frontier = frontier[1:]
+
+    b.frontier = frontier
+    b.generators = [list(perm.P) for perm in x]
+    return result
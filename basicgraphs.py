@@ -5,9 +5,10 @@ It contains three classes: vertex, edge and graph.
 
 The interface of these classes is extensive and allows programming all kinds of graph algorithms.
 
-However, the data structure used is quite basic and inefficient: a graph object stores only a vertex list and an edge list, and methods such as adjacency testing / finding neighbors of a vertex require going through the entire edge list!
+The data structure used is quite basic: a graph object stores a vertex list and an edge list, and every vertex stores its incident edges and its neighbours, which addedge keeps up to date. Methods such as adjacency testing / finding neighbors of a vertex therefore only look at the vertex itself; adjacency testing uses a dictionary of the neighbours of a vertex, which is only built when it is first needed.
 """
 # version: 29-01-2015, Paul Bonsma
+# updated 18-10-2026: vertices store their incident edges and neighbours, vertices and edges use __slots__.
 
 
 unsafe = False
@@ -27,7 +28,14 @@ class vertex():
     Vertex objects have an attribute <_graph> pointing to the graph they are part of, 
     and an attribute <_label> which can be anything: it is not used for any methods,
     except for __repr__. 
+    The attribute <_incidences> is the list of edges incident with the vertex,
+    <_neighbours> is the list of its neighbours (in the same order) and
+    <_adjacent> maps every neighbour to an edge between them, or is None until it is
+    first needed (see _adjacency); all three are maintained by graph.addedge.
+    To save memory, vertices have no __dict__: only the attributes in __slots__ can be set.
     """
+    __slots__ = ('_graph', '_label', 'colornum', 'colortext', 'label',
+                 '_incidences', '_neighbours', '_adjacent')
 
     def __init__(self, graph, label=0):
         """
@@ -39,7 +47,9 @@ class vertex():
         self._graph = graph
         self._label = label
         self.colornum = 0
-        self._neighbours = None
+        self._incidences = []
+        self._neighbours = []
+        self._adjacent = None
 
     def __repr__(self):
         return str(self._label)
@@ -54,11 +64,10 @@ class vertex():
         """
         Returns the list of edges incident with vertex <self>.
         """
-        incl = []
-        for e in self._graph._E:
-            if e.incident(self):
-                incl.append(e)
-        return incl
+        if unsafe:  # but fast
+            return self._incidences
+        else:
+            return self._incidences[:]  # return a *copy* of this list
 
     def nbs(self):
         """
@@ -66,19 +75,17 @@ class vertex():
         In case of parallel edges: duplicates are not removed from this list!
         """
 
-        nbl = []
-        for e in self.inclist():
-            nbl.append(e.otherend(self))
-
-        return nbl
+        return self._neighbours[:]
 
     def get_cached_nbs(self, rebuild_cache=False):
         """
-        Returns a cached list of neighbors of vertex <self>.
+        Returns the cached list of neighbors of vertex <self>, which is kept up to date
+        by graph.addedge. (This list should not be modified.)
+        Optional argument <rebuild_cache>: rebuild the list from the incident edges.
         In case of parallel edges: duplicates are not removed from this list!
         """
-        if self._neighbours is None or rebuild_cache:
-            self._neighbours = self.nbs()
+        if rebuild_cache:
+            self._neighbours = [e.otherend(self) for e in self._incidences]
 
         return self._neighbours
 
@@ -86,7 +93,23 @@ class vertex():
         """
         Returns the degree of vertex <self>.
         """
-        return len(self.inclist())
+        return len(self._incidences)
+
+    def _adjacency(self):
+        """
+        Returns the dictionary <_adjacent> from the neighbours of vertex <self> to an edge between
+        them, which is built from the incident edges the first time it is needed: most graphs are
+        only searched through their neighbour lists, and the dictionaries would take more memory
+        than the rest of the graph.
+        """
+        if self._adjacent is None:
+            adjacent = {}
+            for e in self._incidences:
+                u = e.otherend(self)
+                if u not in adjacent:
+                    adjacent[u] = e
+            self._adjacent = adjacent
+        return self._adjacent
 
     def __cmp__(self, other):
         return 0
@@ -102,7 +125,9 @@ class edge():
     """
     Edges have attributes <_tail> and <_head> which point to the end vertices 
     (vertex objects). The order of these is arbitrary (undirected edges).
+    Like vertices, edges have no __dict__; an edge weight can be stored in <weight>.
     """
+    __slots__ = ('_tail', '_head', 'weight', 'colornum', 'colortext')
 
     def __init__(self, tail, head):
         """
@@ -115,9 +140,6 @@ class edge():
         self._tail = tail
         self._head = head
 
-        tail.neighbours = None
-        head.neighbours = None
-
     def __repr__(self):
         return '(' + str(self._tail) + ',' + str(self._head) + ')'
 
@@ -227,40 +249,123 @@ class graph():
         if self._simple:
             if tail == head:
                 raise GraphError('No loops allowed in simple graphs')
-            for e in self._E:
-                if (e._tail == tail and e._head == head):
-                    raise GraphError(
-                        'No multiedges allowed in simple graphs')
-                if not self._directed:
-                    if (e._tail == head and e._head == tail):
-                        raise GraphError(
-                            'No multiedges allowed in simple graphs')
+            if head in tail._adjacency():
+                raise GraphError(
+                    'No multiedges allowed in simple graphs')
         if not (tail._graph == self and head._graph == self):
             raise GraphError(
                 'Edges of a graph G must be between vertices of G')
         e = edge(tail, head)
         self._E.append(e)
+
+        tail._incidences.append(e)
+        tail._neighbours.append(head)
+        if tail._adjacent is not None and head not in tail._adjacent:
+            tail._adjacent[head] = e
+        if head is not tail:  # a loop is only incident once with its vertex
+            head._incidences.append(e)
+            head._neighbours.append(tail)
+            if head._adjacent is not None and tail not in head._adjacent:
+                head._adjacent[tail] = e
         return e
 
+    @classmethod
+    def from_edge_list(cls, n, pairs, weights=None, simple=False):
+        """
+        Creates a graph with <n> vertices, and an edge between vertex <i> and vertex <j>
+        (as given in the vertex list) for every pair (i, j) in <pairs>, in this order.
+        Optional argument <weights>: a list containing for every pair the weight of its
+        edge, or None if that edge has no weight.
+        Optional argument <simple>: indicates whether the graph should stay simple.
+        The vertices, edges and adjacency are built in a single pass, without the
+        per-edge checks of addedge.
+        """
+        g = cls(simple=simple)
+        V = g._V
+        E = g._E
+        for i in range(n):
+            V.append(vertex(g, i))
+        g._nextlabel = n
+        if simple:
+            seen = set()
+        for k in range(len(pairs)):
+            i, j = pairs[k]
+            if not (0 <= i < n and 0 <= j < n):
+                raise GraphError(
+                    'Edges of a graph G must be between vertices of G')
+            if simple:
+                if i == j:
+                    raise GraphError('No loops allowed in simple graphs')
+                key = (i, j) if i < j else (j, i)
+                if key in seen:
+                    raise GraphError(
+                        'No multiedges allowed in simple graphs')
+                seen.add(key)
+
+            tail = V[i]
+            head = V[j]
+            e = edge(tail, head)
+            if weights is not None and weights[k] is not None:
+                e.weight = weights[k]
+            E.append(e)
+
+            tail._incidences.append(e)
+            tail._neighbours.append(head)
+            if head is not tail:
+                head._incidences.append(e)
+                head._neighbours.append(tail)
+        return g
+
+    def clone(self):
+        """
+        Returns a copy of the graph with new vertex and edge objects: vertex <i> of the copy
+        has the same label and colornum as vertex <i> of <self>, and the copy has the same
+        edges (with their weights).
+        This takes a single linear pass, since the checks done by addedge are not needed.
+        """
+        g = graph(simple=self._simple)
+        g._directed = self._directed
+        g._nextlabel = self._nextlabel
+
+        copies = {}
+        V = g._V
+        for v in self._V:
+            u = vertex(g, v._label)
+            u.colornum = v.colornum
+            copies[v] = u
+            V.append(u)
+
+        E = g._E
+        for e in self._E:
+            tail = copies[e._tail]
+            head = copies[e._head]
+            f = edge(tail, head)
+            try:
+                f.weight = e.weight
+            except AttributeError:
+                pass
+            E.append(f)
+
+            tail._incidences.append(f)
+            tail._neighbours.append(head)
+            if head is not tail:
+                head._incidences.append(f)
+                head._neighbours.append(tail)
+        return g
+
     def findedge(self, u, v):
         """
         If <u> and <v> are adjacent, this returns an edge between them.
         (Arbitrary in the case of multigraphs.)
         Otherwise this returns <None>.
         """
-        for e in self._E:
-            if (e._tail == u and e._head == v) or (e._tail == v and e._head == u):
-                return e
-        return None
+        return u._adjacency().get(v)
 
     def adj(self, u, v):
         """
         Returns True iff vertices <u> and <v> are adjacent.
         """
-        if self.findedge(u, v) == None:
-            return False
-        else:
-            return True
+        return v in u._adjacency()
 
     def isdirected(self):
         """
@@ -0,0 +1,353 @@
+"""
+Canonical labelling of graphs, in the style of nauty.
+
+canonical_form(graph) returns a canonical labelling of the vertices of a graph, and a certificate:
+two graphs have the same certificate if and only if they are isomorphic, so graphs can be sorted
+into isomorphism classes by their certificates (which are hashable) instead of testing all pairs.
+
+The search tree is the one of the individualization-refinement search in gi.py, for a single
+graph: every node individualizes a vertex of the cell chosen by the target cell selector (see
+gi.py; the first non-singleton cell if the selector does not choose one) and refines. The
+partition numbers its cells in a way that does not depend on the order of the vertices, so
+at a leaf (where every cell is a single vertex) the cell numbers give a labelling of the graph,
+and isomorphic graphs have the same set of leaf labellings up to isomorphism. For the same
+reason, the quotient matrix of every node (the trace, see _trace) does not depend on the order of
+the vertices. The leaves are ordered by the traces on their paths and then by their relabelled
+edge lists: the certificate is the edge list of the smallest leaf, and the canonical labelling is
+the labelling of that leaf. As in nauty, this order lets the search skip every node whose trace
+is larger than that of a sibling or of the node at the same level on the path of the smallest
+leaf found so far.
+
+To avoid visiting all leaves, the automorphisms of the graph are computed first (with
+gi.generate_automorphisms): children of a node whose vertices are in the same orbit of the
+pointwise stabilizer of the individualized vertices have subtrees with the same traces and
+relabelled edge lists, so only one child of every orbit is visited. As in the orbit pruning of gi.py, the
+generators that fix the individualized vertices are used for this, instead of a generating set of
+the whole stabilizer (which would have to be computed with Schreier generators at every node).
+Like nauty, the search also finds automorphisms itself: a leaf with the same traces and edge
+list as the first leaf or the smallest leaf so far gives an automorphism. If it fixes the individualized vertices
+of the common ancestor of both leaves and maps the one path onto the other, the rest of the
+subtree of the current child of that ancestor is the image of a subtree that was already visited,
+so the search returns to the ancestor.
+
+The search starts from the colornums of the vertices (see gi.color_cells), and the certificate of
+a graph with colornums other than 0 also contains the colors in the order of the canonical labels,
+so two colored graphs have the same certificate if and only if there is an isomorphism between
+them that preserves the colors.
+
+A graph that is not connected, or whose complement is not connected, gets the canonical form that
+is composed of those of its components or co-components, see components.py, and a graph with
+twins one that is composed of that of its reduced graph, see twins.py.
+"""
+
+import gi
+import anytime
+import components
+import twins
+from partition import partition, adjacency, cache_key
+from permv2 import permutation
+from basicpermutationgroup import Orbit
+
+
+def canonical_form(graph, refine=None, selector=None, budget=None):
+    """
+    Returns a tuple (labelling, certificate) for <graph>: labelling[i] is the canonical label
+    (in 0...n-1) of the vertex graph[i], and <certificate> is a hashable value that is equal
+    for two graphs if and only if they are isomorphic.
+    The optional arguments <refine> and <selector> are used to compute the automorphisms
+    (see gi.py), and <selector> also chooses the cells of the search, whose nodes are counted in
+    gi.nodes; certificates are only comparable if they are computed with the same selector.
+    The result is cached on the graph for the selector, and recomputed after vertices or edges
+    are added or the vertices are recolored.
+    Optional argument <budget>: the search budget (see anytime.py), which is charged for the nodes
+    of the search and of the automorphism search, both parts of its search (see anytime.part).
+    If it runs out, None is returned.
+    """
+    select, name = gi.get_selector(selector)
+    key = (cache_key(graph, colors=True), name)
+    cached = getattr(graph, '_canonical_form', None)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    if budget is not None:
+        budget.start()
+
+    result = components.canonical_form(graph, refine, selector, budget)
+    if result is None and (budget is None or not budget.exhausted):
+        result = twins.canonical_form(graph, refine, selector, budget)
+    if budget is not None and budget.exhausted:
+        return None
+    if result is not None:
+        graph._canonical_form = (key, result)
+        return result
+
+    index, nbs = adjacency(graph)
+    n = len(nbs)
+
+    # the automorphisms, as permutations of the vertex numbers
+    def search(b):
+        y = []
+        gi.generate_automorphisms(graph, graph.clone(), [], [], y, refine=refine, selector=selector, budget=b)
+        return [list(perm.P) for perm in y]
+
+    labels = [v._label for v in graph._V]
+    position = {}
+    for i in range(n):
+        position[labels[i]] = i
+    generators = []
+    for mapping in anytime.part(budget, 'generators', graph, search, []):
+        generators.append(_relabel(mapping, labels, position))
+
+    cells = gi.color_cells(graph._V)
+    p = partition(nbs, cells)
+    p.refine(list(cells), even=False)
+
+    def label(b):
+        best = _search(p, nbs, generators, select, name, b)
+        return None if best is None else best[0]
+
+    labelling = [] if n == 0 else anytime.part(budget, 'labelling ' + name, graph, label, resumable=False)
+    if labelling is None:
+        return None
+    edges = _edges(labelling, nbs)
+
+    if all(v.colornum == 0 for v in graph._V):
+        result = (labelling, (n, edges))
+    else:  # the colors of the vertices in the order of their canonical labels
+        colors = [0] * n
+        for k in range(n):
+            colors[labelling[k]] = graph._V[k].colornum
+        result = (labelling, (n, edges, tuple(colors)))
+    graph._canonical_form = (key, result)
+    return result
+
+
+def certificate(graph, refine=None, selector=None, budget=None):
+    """
+    Returns the certificate of <graph>, or None if the <budget> runs out, see canonical_form.
+    """
+    form = canonical_form(graph, refine, selector, budget)
+    return None if form is None else form[1]
+
+
+def _relabel(perm, labels, position):
+    """
+    Returns the permutation <perm> (or mapping) of vertex labels as a permutation of vertex
+    numbers.
+    """
+    return permutation(len(labels), mapping=[position[perm[labels[i]]] for i in range(len(labels))])
+
+
+def _leaf(p, nbs):
+    """
+    Returns the tuple (labelling, edges) of the discrete partition <p>: the labelling of every
+    vertex by its cell, and the sorted list of pairs of labels of all adjacent vertices.
+    """
+    labelling = p.cellof[:]
+    return labelling, _edges(labelling, nbs)
+
+
+def _edges(labelling, nbs):
+    """
+    Returns the sorted tuple of pairs of labels (see <labelling>) of all adjacent vertices.
+    """
+    edges = []
+    for v in range(len(nbs)):
+        for u in nbs[v]:
+            edges.append((labelling[v], labelling[u]))
+    edges.sort()
+    return tuple(edges)
+
+
+def _search(p, nbs, generators, select, name, budget=None):
+    """
+    Returns the smallest leaf (labelling, edges) in the search tree below the equitable partition
+    <p>, visiting only the children with the smallest trace, and of those one child for every orbit
+    at every node of the group generated by the <generators> that fix the individualized vertices.
+    The automorphisms that are found at the leaves are added to <generators>. The cells are
+    chosen by <select> (or the first non-singleton cell), and the nodes are counted in
+    gi.nodes[name] and charged to <budget> (if any); None is returned if it runs out.
+    The tree is traversed with an explicit stack, as in gi._count_isomorphisms: for every level
+    of the current path, the arrays below hold the target cell, its children, the index of the
+    next candidate, the individualized vertex, the marker to undo its individualization, and
+    for the orbit pruning (see gi._update_orbits) the generators that fix the individualized
+    vertices above it, the number of <generators> that were checked, the vertices that were tried
+    and the union of their orbits. <child_traces> holds the trace of the children of every level,
+    and <traces> the trace of every node on the path.
+    """
+    n = len(nbs)
+    cells = [0] * n
+    members = [None] * n
+    nexts = [0] * n
+    path = [0] * n
+    markers = [0] * n
+    stabilizers = [None] * n
+    checked = [0] * n
+    tried = [None] * n
+    covered = [None] * n
+    child_traces = [None] * n
+
+    traces = [None] * (n + 1)
+    count = 0
+    smaller = None  # the level at which the traces of the current path became smaller than best's
+    first = None  # the first leaf, its path and its traces
+    best = None  # the smallest leaf so far, its path and its traces
+    depth = -1
+    descend = True
+    while True:
+        if descend:
+            count += 1
+            if budget is not None and budget.spend():
+                gi.nodes[name] = gi.nodes.get(name, 0) + count
+                return None
+            level = depth + 1
+            trace = _trace(p) if depth < 0 else child_traces[depth]
+            traces[level] = trace
+            if smaller is None and best is not None:
+                if trace > best[2][level]:  # no leaf below this node can be the smallest
+                    descend = False
+                elif trace < best[2][level]:
+                    smaller = level
+
+        if descend:
+            if len(p.start) == n:
+                leaf = _leaf(p, nbs)
+                if best is None or smaller is not None or leaf[1] < best[0][1]:
+                    best = (leaf, path[:level], traces[:level + 1])
+                    if first is None:
+                        first = best
+                    smaller = None
+                else:
+                    for known in (first, best):
+                        if leaf[1] == known[0][1] and traces[:level + 1] == known[2]:
+                            jump = _automorphism(leaf, known, path, depth, generators)
+                            if jump is not None:
+                                depth = jump
+                                break
+            else:
+                depth += 1
+                c = select(p)
+                if c is None:
+                    for d in range(len(p.start)):
+                        if p.end[d] - p.start[d] >= 2:
+                            c = d
+                            break
+                cells[depth] = c
+                smallest = _smallest_children(p, c, budget)
+                if smallest is None:
+                    gi.nodes[name] = gi.nodes.get(name, 0) + count
+                    return None
+                members[depth], child_traces[depth] = smallest
+                nexts[depth] = 0
+                stabilizers[depth] = []
+                checked[depth] = 0
+                tried[depth] = []
+                covered[depth] = set()
+
+        # continue with the next child on the deepest level that has one
+        descend = False
+        while depth >= 0:
+            k = nexts[depth]
+            if k > 0:
+                p.undo(markers[depth])
+            gi._update_orbits(generators, path, depth, depth, stabilizers, checked, tried, covered)
+            candidates = members[depth]
+            while k < len(candidates) and candidates[k] in covered[depth]:
+                k += 1
+            if k == len(candidates):
+                depth -= 1
+                continue
+
+            v = candidates[k]
+            nexts[depth] = k + 1
+            if smaller is not None and smaller > depth:
+                smaller = None
+            path[depth] = v
+            tried[depth].append(v)
+            if len(stabilizers[depth]) == 0:
+                covered[depth].add(v)
+            else:
+                covered[depth].update(Orbit(stabilizers[depth], v))
+            markers[depth] = p.mark()
+            p.refine(p.split(cells[depth], [v]), even=False)
+            descend = True
+            break
+
+        if depth < 0:
+            gi.nodes[name] = gi.nodes.get(name, 0) + count
+            return best[0]
+
+
+def _smallest_children(p, c, budget=None):
+    """
+    Returns a tuple (children, trace): the sorted list of the vertices of cell <c> of <p> whose
+    individualization gives the smallest trace, and that trace. The leaves below the other
+    children have larger traces, so they do not have to be visited.
+    Every individualization is charged to <budget> (if any) like a search node; None is returned
+    if it runs out.
+    """
+    best = None
+    children = []
+    for v in sorted(p.members(c)):
+        if budget is not None and budget.spend():
+            return None
+        marker = p.mark()
+        p.refine(p.split(c, [v]), even=False)
+        trace = _trace(p)
+        p.undo(marker)
+        if best is None or trace < best:
+            best = trace
+            children = [v]
+        elif trace == best:
+            children.append(v)
+    return children, best
+
+
+def _trace(p):
+    """
+    Returns the quotient matrix of the equitable partition <p>: for every cell (ordered by cell
+    number) its size and the number of neighbours that its vertices have in every cell, as in
+    gi.signature. Like the cell numbers, this does not depend on the order of the vertices.
+    """
+    nbs = p.nbs
+    cellof = p.cellof
+    trace = []
+    for c in range(len(p.start)):
+        counts = {}
+        for u in nbs[p.elements[p.start[c]]]:
+            d = cellof[u]
+            counts[d] = counts.get(d, 0) + 1
+        trace.append((p.end[c] - p.start[c], tuple(sorted(counts.items()))))
+    return tuple(trace)
+
+
+def _automorphism(leaf, known, path, depth, generators):
+    """
+    Adds the automorphism that maps the <known> leaf (a tuple of a leaf, its path and its traces)
+    onto <leaf>, the leaf with the same traces and edge list at the end of path[0:depth + 1], to
+    <generators>.
+    Returns the level of the common ancestor of both leaves if the automorphism fixes the
+    individualized vertices above it and maps the known path onto the current one, so the
+    subtree of the current child of that ancestor does not have to be visited; otherwise None.
+    """
+    labelling = leaf[0]
+    n = len(labelling)
+    vertex = [0] * n
+    for v in range(n):
+        vertex[labelling[v]] = v
+    known_labelling = known[0][0]
+    mapping = [vertex[known_labelling[v]] for v in range(n)]
+    if mapping == list(range(n)):
+        return None
+    perm = permutation(n, mapping=mapping)
+    generators.append(perm)
+
+    known_path = known[1]
+    level = 0
+    while level < depth and known_path[level] == path[level]:
+        level += 1
+    if perm[known_path[level]] != path[level]:
+        return None
+    for k in range(level):
+        if perm[path[k]] != path[k]:
+            return None
+    return level
@@ -0,0 +1,191 @@
+"""
+Automorphisms and canonical forms of graphs by their components or co-components.
+
+A graph that is not connected is the disjoint union of its components, and a graph whose
+complement is not connected is the join of its co-components (the subgraphs on the components of
+its complement, which are joined by all edges between them). In both cases every automorphism
+maps the parts onto parts, so the automorphism group is generated by the automorphisms of one
+part of every isomorphism class (fixing the other vertices), and for every class of k isomorphic
+parts a permutation that swaps the first two of them and (if k > 2) one that cycles all of them,
+along isomorphisms between them. Its order is the product of |Aut(C)|^k * k! over the classes.
+
+The parts are sorted into classes by their certificates (see canon.py), and only one part of
+every class is searched. Parts whose signature (see gi.signature) and colors are not shared by
+another part are in a class of their own, so their canonical forms are not needed. Since every
+part is connected, the search of a part that has a disconnected complement splits it again.
+The canonical form of the graph is composed of those of its parts, in the order of their
+certificates, and its certificate is the kind of split with the sorted certificates of the parts.
+
+gi.generate_automorphisms (without individualized vertices) and canon.canonical_form use
+generate_automorphisms and canonical_form. The orders are counted by modules.py, whose parallel
+and series nodes are the components and co-components. Co-components are only used for graphs
+without loops and multiple edges, as multiple edges between parts are not preserved by their
+permutations.
+"""
+
+import gi
+import anytime
+import canon
+from basicgraphs import graph
+from partition import adjacency, cached, is_simple, components_of
+from permv2 import permutation
+
+
+def split(g):
+    """
+    Returns a tuple (kind, parts) for <g>: <kind> is 'components' or 'co-components', and <parts>
+    the list of these parts (as lists of vertex numbers, see partition.adjacency). Returns None if
+    <g> is connected and has a connected complement (or loops or multiple edges).
+    """
+    return cached(g, '_components', lambda: _split(g))
+
+
+def _split(g):
+    index, nbs = adjacency(g)
+    n = len(nbs)
+    inside = [0] * n
+    parts = components_of(nbs, list(range(n)), inside, 0, False)
+    if len(parts) > 1:
+        return ('components', parts)
+    if is_simple(nbs):
+        parts = components_of(nbs, list(range(n)), inside, 0, True)
+        if len(parts) > 1:
+            return ('co-components', parts)
+    return None
+
+
+def generate_automorphisms(g, x, firstPruningRule=True, secondPruningRule=True, membershipTesting=False, refine=None, selector=None, orbitPruning=True, jobs=None, budget=None):
+    """
+    Adds generators of the automorphism group of <g> to x if <g> is not connected or has a
+    complement that is not connected, as permutations of the labels of its vertices (like
+    gi.generate_automorphisms), and returns True; returns None otherwise.
+    The optional arguments are used for the search of the parts, see gi.generate_automorphisms.
+    With a <budget>, these searches are parts of its search (see anytime.part), and the canonical
+    forms of the parts are charged to it; if it runs out before the parts are sorted into
+    classes, no generators are added.
+    """
+    parts = split(g)
+    if parts is None:
+        return None
+    labels = [v._label for v in g._V]
+
+    classes = _classes(g, parts[1], refine, selector, budget)
+    if classes is None:
+        return True
+    for members in classes:
+        part, sub, labelling = members[0]
+
+        def search(b):
+            y = []
+            gi.generate_automorphisms(sub, sub.clone(), [], [], y, firstPruningRule, secondPruningRule, membershipTesting, refine, selector, orbitPruning, jobs, b)
+            return [list(perm.P) for perm in y]
+
+        for perm in anytime.part(budget, 'generators', sub, search, []):
+            mapping = list(range(len(labels)))
+            for k in range(len(part)):
+                mapping[labels[part[k]]] = labels[part[perm[k]]]
+            x.append(permutation(len(mapping), mapping=mapping))
+
+        cycles = [members[:2]] if len(members) > 1 else []
+        if len(members) > 2:
+            cycles.append(members)
+        for cycle in cycles:
+            mapping = list(range(len(labels)))
+            for j in range(len(cycle)):
+                _map(mapping, cycle[j], cycle[(j + 1) % len(cycle)], labels)
+            x.append(permutation(len(mapping), mapping=mapping))
+    return True
+
+
+def canonical_form(g, refine=None, selector=None, budget=None):
+    """
+    Returns the canonical form (labelling, certificate) of <g> (see canon.canonical_form) composed
+    of those of its parts, or None if <g> is connected and has a connected complement (or the
+    <budget> runs out).
+    """
+    parts = split(g)
+    if parts is None:
+        return None
+    forms = []
+    for part in parts[1]:
+        form = canon.canonical_form(_subgraph(g, part), refine, selector, budget)
+        if form is None:
+            return None
+        forms.append((form[1], part, form[0]))
+    # certificates of different forms cannot be compared, so they are sorted by their text
+    forms.sort(key=lambda form: repr(form[0]))
+
+    labelling = [0] * len(g._V)
+    offset = 0
+    for certificate, part, part_labelling in forms:
+        for k in range(len(part)):
+            labelling[part[k]] = offset + part_labelling[k]
+        offset += len(part)
+    return labelling, (parts[0], tuple(form[0] for form in forms))
+
+
+def _classes(g, parts, refine, selector, budget=None):
+    """
+    Returns the isomorphism classes of the <parts> of <g>, as lists of tuples (part, subgraph,
+    labelling): the list of vertex numbers, the subgraph on these vertices and its canonical
+    labelling (None for a part that is the only one in its class). Returns None if the <budget>
+    runs out.
+    """
+    candidates = {}
+    for part in parts:
+        sub = _subgraph(g, part)
+        key = (len(part), gi.signature(sub), tuple(sorted(v.colornum for v in sub._V)))
+        if key in candidates:
+            candidates[key].append((part, sub))
+        else:
+            candidates[key] = [(part, sub)]
+
+    classes = []
+    for candidate in candidates.values():
+        if len(candidate) == 1:
+            classes.append([(candidate[0][0], candidate[0][1], None)])
+            continue
+        by_certificate = {}
+        for part, sub in candidate:
+            form = canon.canonical_form(sub, refine, selector, budget)
+            if form is None:
+                return None
+            labelling, certificate = form
+            if certificate in by_certificate:
+                by_certificate[certificate].append((part, sub, labelling))
+            else:
+                by_certificate[certificate] = [(part, sub, labelling)]
+        classes += by_certificate.values()
+    return classes
+
+
+def _subgraph(g, part):
+    """
+    Returns the subgraph of <g> on the vertex numbers in <part>, with vertex k of the subgraph
+    (labelled k) for vertex part[k], with the same colornum.
+    """
+    index, nbs = adjacency(g)
+    local = {}
+    for v in part:
+        local[v] = len(local)
+    pairs = []
+    for v in part:
+        for u in nbs[v]:
+            if u >= v and u in local:
+                pairs.append((local[v], local[u]))
+    sub = graph.from_edge_list(len(part), pairs)
+    for k in range(len(part)):
+        sub._V[k].colornum = g._V[part[k]].colornum
+    return sub
+
+
+def _map(mapping, a, b, labels):
+    """
+    Maps the part of <a> onto the isomorphic part of <b> (tuples (part, subgraph, labelling)) in
+    the list <mapping> of labels: every vertex onto the vertex with the same canonical label.
+    """
+    vertex = [0] * len(b[0])
+    for k in range(len(b[0])):
+        vertex[b[2][k]] = b[0][k]
+    for k in range(len(a[0])):
+        mapping[labels[a[0][k]]] = labels[vertex[a[2][k]]]
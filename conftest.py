@@ -0,0 +1,86 @@
+"""
+Helpers for the tests: random graphs, relabelled copies and a brute-force isomorphism count to
+compare the search functions with.
+"""
+
+import random
+from itertools import permutations
+
+import pytest
+
+from basicgraphs import graph
+
+
+def _random_graph(rnd, n, p, colors=1):
+    """
+    Returns a graph with <n> vertices in which every pair is adjacent with probability <p>, and
+    the vertices have random colornums below <colors>.
+    """
+    pairs = [(i, j) for i in range(n) for j in range(i + 1, n) if rnd.random() < p]
+    g = graph.from_edge_list(n, pairs, simple=True)
+    for v in g._V:
+        v.colornum = rnd.randrange(colors)
+    return g
+
+
+def _relabel(g, rnd):
+    """
+    Returns a copy of <g> whose vertices are shuffled, with the same colornums.
+    """
+    n = len(g._V)
+    order = list(range(n))
+    rnd.shuffle(order)
+    index = {}
+    for v in g._V:
+        index[v] = len(index)
+    pairs = [(order[index[e.tail()]], order[index[e.head()]]) for e in g._E]
+    h = graph.from_edge_list(n, pairs, simple=True)
+    for v in g._V:
+        h._V[order[index[v]]].colornum = v.colornum
+    return h
+
+
+def _brute_count(g, h):
+    """
+    Returns the number of bijections from the vertices of g to those of h that preserve the
+    colornums and the edges, by trying all of them.
+    """
+    n = len(g._V)
+    if len(h._V) != n:
+        return 0
+    index_g = {}
+    for v in g._V:
+        index_g[v] = len(index_g)
+    index_h = {}
+    for v in h._V:
+        index_h[v] = len(index_h)
+    edges_g = set(frozenset((index_g[e.tail()], index_g[e.head()])) for e in g._E)
+    edges_h = set(frozenset((index_h[e.tail()], index_h[e.head()])) for e in h._E)
+    if len(edges_g) != len(edges_h):
+        return 0
+    count = 0
+    for perm in permutations(range(n)):
+        if all(g._V[k].colornum == h._V[perm[k]].colornum for k in range(n)) and \
+                all(frozenset(perm[k] for k in e) in edges_h for e in edges_g):
+            count += 1
+    return count
+
+
+@pytest.fixture
+def rnd():
+    return random.Random(2016)
+
+
+@pytest.fixture
+def random_graph():
+    return _random_graph
+
+
+@pytest.fixture
+def relabel():
+    return _relabel
+
+
+@pytest.fixture
+def brute_count():
+    return _brute_count
@@ -0,0 +1,383 @@
+"""
+This is a module for working with large *undirected* graphs (simple graphs or multigraphs)
+in a compact form.
+
+It contains three classes: csrvertex, csredge and csrgraph, which support the same
+interface as the classes vertex, edge and graph from basicgraphs.py, so they can be used
+with graphIO.loadgraph(filename, graphclass=csrgraph) and with the algorithms in gi.py and fgi.py.
+
+Instead of storing an edge object for every edge, a csrgraph stores the end points of
+all edges in two integer arrays. From these, a compressed sparse row (CSR) adjacency
+structure is built the first time it is needed: the neighbours of the vertex with id <i>
+are <_nbs>[<_offsets>[i]:<_offsets>[i + 1]], a contiguous part of a single array.
+Edge objects are only created on request, e.g. by E() or inclist().
+"""
+# version: 18-10-2026
+
+from array import array
+from basicgraphs import GraphError
+
+
+class csrvertex():
+    """
+    A csrvertex has an attribute <_graph> pointing to the graph it is part of,
+    an attribute <_id> which is its index in the vertex list of the graph,
+    and an attribute <_label> which is only used for __repr__.
+    """
+    __slots__ = ('_graph', '_id', '_label', 'colornum')
+
+    def __init__(self, graph, id, label=0):
+        self._graph = graph
+        self._id = id
+        self._label = label
+        self.colornum = 0
+
+    def __repr__(self):
+        return str(self._label)
+
+    def adj(self, other):
+        """
+        Returns True iff vertex <self> is adjacent to <other> vertex.
+        """
+        return self._graph.adj(self, other)
+
+    def inclist(self):
+        """
+        Returns the list of edges incident with vertex <self>.
+        """
+        g = self._graph
+        offsets = g.offsets()
+        return [csredge(g, e) for e in g._eids[offsets[self._id]:offsets[self._id + 1]]]
+
+    def nbs(self):
+        """
+        Returns the list of neighbors of vertex <self>.
+        In case of parallel edges: duplicates are not removed from this list!
+        """
+        g = self._graph
+        offsets = g.offsets()
+        V = g._V
+        return [V[j] for j in g._nbs[offsets[self._id]:offsets[self._id + 1]]]
+
+    def get_cached_nbs(self, rebuild_cache=False):
+        """
+        Returns the list of neighbors of vertex <self>.
+        The list is built from the CSR arrays the first time it is needed, and kept by the graph
+        until vertices or edges are added, so <rebuild_cache> is ignored.
+        """
+        lists = self._graph.nbs_lists()
+        l = lists[self._id]
+        if l is None:
+            l = self.nbs()
+            lists[self._id] = l
+        return l
+
+    def deg(self):
+        """
+        Returns the degree of vertex <self>.
+        """
+        offsets = self._graph.offsets()
+        return offsets[self._id + 1] - offsets[self._id]
+
+    def __cmp__(self, other):
+        return 0
+
+    def __lt__(self, other):
+        return 0
+
+    def __gt__(self, other):
+        return 0
+
+
+class csredge():
+    """
+    A csredge is a light-weight view on edge number <_index> of the graph <_graph>.
+    Two views on the same edge compare equal.
+    """
+    __slots__ = ('_graph', '_index')
+
+    def __init__(self, graph, index):
+        self._graph = graph
+        self._index = index
+
+    def __repr__(self):
+        return '(' + str(self.tail()) + ',' + str(self.head()) + ')'
+
+    def __eq__(self, other):
+        return isinstance(other, csredge) and self._graph is other._graph and self._index == other._index
+
+    def __hash__(self):
+        return hash((id(self._graph), self._index))
+
+    def tail(self):
+        return self._graph._V[self._graph._tails[self._index]]
+
+    def head(self):
+        return self._graph._V[self._graph._heads[self._index]]
+
+    @property
+    def weight(self):
+        try:
+            return self._graph._weights[self._index]
+        except KeyError:
+            raise AttributeError('weight')
+
+    @weight.setter
+    def weight(self, value):
+        self._graph._weights[self._index] = value
+
+    def otherend(self, oneend):
+        """
+        Given one end vertex <oneend> of the edge <self>, this returns
+        the other end vertex of <self>.
+        """
+        tail = self.tail()
+        head = self.head()
+        if tail == oneend:
+            return head
+        elif head == oneend:
+            return tail
+        raise GraphError(
+            'edge.otherend(oneend): oneend must be head or tail of edge')
+
+    def incident(self, vertex):
+        """
+        Returns True iff the edge <self> is incident with the
+        vertex <vertex>.
+        """
+        return vertex._graph is self._graph and \
+            (self._graph._tails[self._index] == vertex._id or self._graph._heads[self._index] == vertex._id)
+
+
+class csrgraph():
+    """
+    A csrgraph object has as main attributes:
+     <_V>: the list of its vertices
+     <_tails>, <_heads>: integer arrays with the vertex ids of the end points of every edge
+     <_offsets>, <_nbs>, <_eids>: the CSR adjacency structure, or None if it has to be
+        (re)built, see offsets(). <_eids> gives the edge number for every entry of <_nbs>.
+     <_nbs_lists>: the lists of neighbours that were built, see nbs_lists()
+     <_weights>: a dictionary from edge numbers to edge weights
+    The attributes <_simple>, <_directed> and <_nextlabel> are as in basicgraphs.graph.
+    """
+
+    def __init__(self, n=0, simple=False):
+        """
+        Creates a graph.
+        Optional argument <n>: number of vertices.
+        Optional argument <simple>: indicates whether the graph should stay simple.
+        """
+        self._V = []
+        self._tails = array('i')
+        self._heads = array('i')
+        self._weights = {}
+        self._offsets = None
+        self._nbs = None
+        self._eids = None
+        self._nbs_lists = None
+        self._directed = False
+        self._simple = simple
+        self._edgeset = set() if simple else None
+        self._nextlabel = 0
+        for i in range(n):
+            self.addvertex()
+
+    def __repr__(self):
+        return 'V=' + str(self._V) + '\nE=' + str(self.E())
+
+    def V(self):
+        """
+        Returns the list of vertices of the graph.
+        """
+        return self._V[:]
+
+    def E(self):
+        """
+        Returns the list of edges of the graph.
+        """
+        return [csredge(self, e) for e in range(len(self._tails))]
+
+    def __getitem__(self, i):
+        """
+        Returns the <i>th vertex of the graph.
+        """
+        return self._V[i]
+
+    def __contains__(self, v):
+        """
+        Returns True iff <v> is a vertex of this graph.
+        """
+        return getattr(v, '_graph', None) is self
+
+    def addvertex(self, label=-1):
+        """
+        Add a vertex to the graph.
+        Optional argument: a vertex label (arbitrary)
+        """
+        if label == -1:
+            label = self._nextlabel
+            self._nextlabel += 1
+        u = csrvertex(self, len(self._V), label)
+        self._V.append(u)
+        self._offsets = None
+        self._nbs_lists = None
+        return u
+
+    def addedge(self, tail, head):
+        """
+        Add an edge to the graph between <tail> and <head>.
+        Includes some checks in case the graph should stay simple.
+        """
+        if not (tail._graph is self and head._graph is self):
+            raise GraphError(
+                'Edges of a graph G must be between vertices of G')
+        if self._simple:
+            if tail is head:
+                raise GraphError('No loops allowed in simple graphs')
+            key = (tail._id, head._id) if tail._id < head._id else (head._id, tail._id)
+            if key in self._edgeset:
+                raise GraphError(
+                    'No multiedges allowed in simple graphs')
+            self._edgeset.add(key)
+        self._tails.append(tail._id)
+        self._heads.append(head._id)
+        self._offsets = None
+        self._nbs_lists = None
+        return csredge(self, len(self._tails) - 1)
+
+    @classmethod
+    def from_edge_list(cls, n, pairs, weights=None, simple=False):
+        """
+        Creates a graph with <n> vertices, and an edge between the vertices with ids <i>
+        and <j> for every pair (i, j) in <pairs>, in this order.
+        Optional argument <weights>: a list containing for every pair the weight of its
+        edge, or None if that edge has no weight.
+        Optional argument <simple>: indicates whether the graph should stay simple.
+        The edge arrays are filled directly, without creating edge objects.
+        """
+        g = cls(n, simple)
+        tails = g._tails
+        heads = g._heads
+        for i, j in pairs:
+            tails.append(i)
+            heads.append(j)
+        if len(tails) > 0 and (min(tails) < 0 or max(tails) >= n or min(heads) < 0 or max(heads) >= n):
+            raise GraphError(
+                'Edges of a graph G must be between vertices of G')
+        if simple:
+            for e in range(len(tails)):
+                i = tails[e]
+                j = heads[e]
+                if i == j:
+                    raise GraphError('No loops allowed in simple graphs')
+                key = (i, j) if i < j else (j, i)
+                if key in g._edgeset:
+                    raise GraphError(
+                        'No multiedges allowed in simple graphs')
+                g._edgeset.add(key)
+        if weights is not None:
+            for e in range(len(weights)):
+                if weights[e] is not None:
+                    g._weights[e] = weights[e]
+        return g
+
+    def clone(self):
+        """
+        Returns a copy of the graph with new vertex objects: vertex <i> of the copy has the
+        same label and colornum as vertex <i> of <self>, and the copy has the same edges (with
+        their weights).
+        The edge arrays are copied as a whole, and the CSR arrays (which are never modified
+        once built) are shared with <self>. The lists of neighbours are not, as they hold the
+        vertex objects.
+        """
+        g = csrgraph(simple=self._simple)
+        g._directed = self._directed
+        g._nextlabel = self._nextlabel
+        g._V = [csrvertex(g, v._id, v._label) for v in self._V]
+        for k in range(len(g._V)):
+            g._V[k].colornum = self._V[k].colornum
+        g._tails = self._tails[:]
+        g._heads = self._heads[:]
+        g._weights = dict(self._weights)
+        if self._simple:
+            g._edgeset = set(self._edgeset)
+        g._offsets = self._offsets
+        g._nbs = self._nbs
+        g._eids = self._eids
+        return g
+
+    def offsets(self):
+        """
+        Returns the offset array of the CSR adjacency structure, building the structure
+        from the edge arrays if edges or vertices were added since it was last built.
+        A loop is listed only once in the neighbours of its vertex, like in basicgraphs.
+        """
+        if self._offsets is not None:
+            return self._offsets
+
+        n = len(self._V)
+        tails = self._tails
+        heads = self._heads
+
+        offsets = array('l', [0]) * (n + 1)
+        for e in range(len(tails)):
+            offsets[tails[e] + 1] += 1
+            if tails[e] != heads[e]:
+                offsets[heads[e] + 1] += 1
+        for i in range(n):
+            offsets[i + 1] += offsets[i]
+
+        nbs = array('i', [0]) * offsets[n]
+        eids = array('i', [0]) * offsets[n]
+        fill = offsets[:n]
+        for e in range(len(tails)):
+            t = tails[e]
+            h = heads[e]
+            nbs[fill[t]] = h
+            eids[fill[t]] = e
+            fill[t] += 1
+            if t != h:
+                nbs[fill[h]] = t
+                eids[fill[h]] = e
+                fill[h] += 1
+
+        self._nbs = nbs
+        self._eids = eids
+        self._offsets = offsets
+        return offsets
+
+    def nbs_lists(self):
+        """
+        Returns the list that holds the list of neighbours of every vertex (None for the vertices
+        whose list has not been built yet), see csrvertex.get_cached_nbs.
+        """
+        if self._nbs_lists is None or self._offsets is None:
+            self.offsets()
+            self._nbs_lists = [None] * len(self._V)
+        return self._nbs_lists
+
+    def findedge(self, u, v):
+        """
+        If <u> and <v> are adjacent, this returns an edge between them.
+        (Arbitrary in the case of multigraphs.)
+        Otherwise this returns <None>.
+        """
+        offsets = self.offsets()
+        nbs = self._nbs
+        target = v._id
+        for k in range(offsets[u._id], offsets[u._id + 1]):
+            if nbs[k] == target:
+                return csredge(self, self._eids[k])
+        return None
+
+    def adj(self, u, v):
+        """
+        Returns True iff vertices <u> and <v> are adjacent.
+        """
+        return self.findedge(u, v) is not None
+
+    def isdirected(self):
+        """
+        Returns False, because for now these graphs are always undirected.
+        """
+        return self._directed
@@ -1,7 +1,77 @@
+"""
+Isomorphism and automorphism search by color refinement and individualization.
+
+The search is the same for every refinement strategy: a strategy is a function
+refine(p, queue) that refines a partition <p> (see partition.py), starting with the cells in
+<queue>, and returns False iff it detects an unbalanced coloring. The strategies in STRATEGIES
+are:
+ 'classic': recolor_partition, which splits cells on the sorted colors of their neighbours,
+ 'hopcroft': fast_recolor_partition, Hopcroft's partition refinement (see partition.py),
+ 'vector': vrecolor.recolor_partition, vectorised rounds with NumPy.
+The <refine> argument of the search functions can be one of these names, a refinement function,
+or None (or 'auto'), in which case select_strategy chooses one for every pair of graphs.
+A name followed by '+2wl' (e.g. 'hopcroft+2wl', or 'auto+2wl') also applies 2-dimensional
+Weisfeiler-Leman refinement when large cells remain, see wl2.py.
+
+The search colors both graphs in one partition with <half> set to the number of vertices of a
+graph, and every strategy returns False as soon as a cell is split into parts that do not contain
+as many vertices of both graphs: at that point the refinement traces of the two graphs diverge,
+so the rest of the refinement can be skipped.
+
+The partition starts from the colornums of the vertices (0 unless they are set, see color_cells):
+the isomorphisms and automorphisms that are searched for map every vertex onto a vertex with the
+same colornum.
+
+Every node of the search branches on the vertices of a target cell, which is chosen by a
+selector: a function select(p) that returns a cell of <p> with at least 4 vertices (2 of both
+graphs). The selectors in SELECTORS are:
+ 'first': the cell with the lowest number,
+ 'smallest', 'largest': the smallest or largest cell (the lowest number in case of a tie),
+ 'adjacent': the cell whose vertices have neighbours in the most other cells with at least 4
+     vertices, without being adjacent to all vertices of such a cell.
+The <selector> argument of the search functions can be one of these names or a selector function.
+The number of search nodes of every selector is added up in <nodes>.
+
+With a <jobs> argument greater than 1, count_isomorphism, automorphism_order,
+generate_automorphisms and count_automorphisms search the subtrees below the first levels of the
+search in that many worker processes, see parallel.py.
+
+Forests are solved by their canonical encodings instead (see trees.py): count_isomorphism (unless
+it is exhaustive or vertices are individualized), automorphism_order, count_automorphisms and
+generate_automorphisms (without individualized vertices) do not search them at all. Other graphs
+whose modular decomposition is not trivial (e.g. cographs) are solved by their decomposition trees
+(see modules.py): count_isomorphism, automorphism_order and count_automorphisms only search the
+quotient graphs of the prime nodes of these trees, and generate_automorphisms only searches one
+component or co-component of every isomorphism class of a graph that has several (see
+components.py), and collapses every class of twins (vertices with the same neighbours) into one
+vertex, colored by the size of the class (see twins.py).
+
+Connected graphs with pendant trees (that are not forests) are solved by their cores (see
+pendant.py): count_isomorphism (unless it is exhaustive or vertices are individualized),
+automorphism_order and count_automorphisms remove the pendant trees and color every vertex of the
+core by the code of the tree that hangs from it, so the search does not refine or branch on them.
+
+With a <budget> argument (see anytime.py), these functions stop when the budget of search nodes
+or wall-clock time runs out, keep the frontier of the search and the partial results in the
+budget, and continue from that frontier when they are called again with it. Forests are solved
+without charging the budget, and the other graphs above are solved by searches of their cores,
+quotient graphs, parts or reduced graphs that are charged to it.
+"""
+
 from basicgraphs import graph  # , GraphError, vertex, edge
 import permgrputil
 from permv2 import permutation
 from basicpermutationgroup import Orbit
+from partition import partition, adjacency, pair_adjacency, cache_key, cached
+import vrecolor
+import wl2
+import parallel
+import anytime
+import modules
+import trees
+import components
+import twins
+import pendant
 
 
 # deprecated
@@ -96,224 +166,752 @@ def recolor(colors):  # bg_1, bg_2, are not used
     return True
 
 
-def create_color_dict(g, h):
+def recolor_partition(p, queue):
+    """
+    Refines the partition <p> (see partition.py) in the same way as recolor: the vertices of a
+    cell are split according to the sorted list of the cells of their neighbours, until this
+    does not change anymore. Only the cells with a neighbour in a cell that was split off
+    (initially: in one of the cells in <queue>) have to be considered again.
+    If p.half is set, this stops as soon as a cell is split unevenly (see partition.py).
+    :return: <False> iff unbalanced coloring is detected;
+     otherwise when done returns <True>, coloring can still be unbalanced.
+    """
+    nbs = p.nbs
+    cellof = p.cellof
+
+    def neighbour_cells(v):
+        return sorted([cellof[u] for u in nbs[v]])
+
+    changed = queue
+    while len(changed) > 0:
+        candidates = set()
+        for c in changed:
+            # if the number of vertexes is odd, the coloring is unbalanced, we can stop
+            if (p.end[c] - p.start[c]) % 2 == 1:
+                return False
+            for v in p.members(c):
+                for u in nbs[v]:
+                    candidates.add(cellof[u])
+
+        changed = []
+        for c in sorted(candidates):
+            if p.end[c] - p.start[c] > 1:
+                new = p.split_by(c, neighbour_cells)
+                # stop as soon as the traces of both graphs diverge
+                if p.half is not None and len(new) > 0 and \
+                        not all(p.is_balanced(d) for d in new + [c]):
+                    return False
+                changed += new
+
+    return True
+
+
+def fast_recolor_partition(p, queue):
+    """
+    Refines the partition <p> (see partition.py) with Hopcroft's algorithm, using the cells in
+    <queue> to split the other cells first.
+    :return: <False> iff unbalanced coloring is detected;
+     otherwise when done returns <True>, coloring can still be unbalanced.
+    """
+    return p.refine(queue)
+
+
+STRATEGIES = {
+    'classic': recolor_partition,
+    'hopcroft': fast_recolor_partition,
+    'vector': vrecolor.recolor_partition,
+}
+
+
+def select_strategy(g, h=None):
     """
-    Creates the color dict based on the colornums of the vertices in graphs g and h.
+    Returns the name of the refinement strategy that is expected to be the fastest for the
+    graphs g and h, based on their numbers of vertices and edges: the vectorised rounds pay off
+    for large graphs with a high average degree (if NumPy is available), because every round
+    handles all edges at once. Otherwise Hopcroft's refinement is used; it is never much slower
+    than the classic refinement, and much faster if many rounds are needed, e.g. on graphs with
+    long paths.
     """
-    colors = {}
-    colors_get = colors.get
-    for v in g._V:
-        l = colors_get(v.colornum, [])
-        l.append(v)
-        colors[v.colornum] = l
-    for v in h._V:
-        l = colors_get(v.colornum, [])
-        l.append(v)
-        colors[v.colornum] = l
+    n = 0
+    m = 0
+    for G in (g, h):
+        if G is not None:
+            n += len(G._V)
+            m += len(G._E) if hasattr(G, '_E') else len(G._tails)
 
-    return colors
+    if vrecolor.numpy is not None and n >= 1000 and m >= 16 * n:
+        return 'vector'
+    return 'hopcroft'
 
 
-def set_colors(graph, l):
+def get_strategy(refine, g, h=None):
+    """
+    Returns the refinement function for the <refine> argument of the search functions (see the
+    module documentation) and the graphs g and h.
+    """
+    if isinstance(refine, str) and refine.endswith('+2wl'):
+        return wl2.refinement(get_strategy(refine[:-len('+2wl')], g, h))
+    if refine is None or refine == 'auto':
+        refine = select_strategy(g, h)
+    if isinstance(refine, str):
+        if refine not in STRATEGIES:
+            raise ValueError('unknown refinement strategy: ' + refine)
+        return STRATEGIES[refine]
+    return refine
+
+
+def signature(graph):
     """
-    Assigns a color to every vertex of the given graph, 0 if a vertex is not in l,
-    or the index in l + 1 otherwise.
+    Returns a hash of the coarsest equitable partition of <graph> alone: the sizes of its cells,
+    and for every cell the number of neighbours that its vertices have in every other cell.
+    Hopcroft's refinement numbers the cells in a way that only depends on the cells and neighbour
+    counts, and not on the order of the vertices, so isomorphic graphs have the same signature.
     """
-    for v in graph:
-        v.colornum = 0
-    
-    i = 1
-    for v in l:
-        v.colornum = i
-        i += 1
+    return cached(graph, '_signature', lambda: _signature(graph))
+
+
+def _signature(graph):
+    index, nbs = adjacency(graph)
+    p = partition(nbs, {0: list(range(len(nbs)))})
+    p.refine([0], even=False)
+
+    degrees = []
+    for c in range(len(p.start)):
+        counts = {}
+        for u in nbs[p.elements[p.start[c]]]:
+            d = p.cellof[u]
+            counts[d] = counts.get(d, 0) + 1
+        degrees.append(tuple(sorted(counts.items())))
+    sizes = tuple(p.end[c] - p.start[c] for c in range(len(p.start)))
+    return hash((sizes, tuple(degrees)))
 
 
 # see slides lecture 2 page 23
 # g and h instance of graph
-def count_isomorphism(g, h, d=None, i=None, stop_early=False):
+def count_isomorphism(g, h, d=None, i=None, stop_early=False, refine=None, selector=None, exhaustive=False, jobs=None, budget=None):
     """
     Returns the number of isomorphisms between graphs g and h. If stop_early is specified,
     the algorithm terminates as soon as an isomorphism is found, returns 1 if an isomorphism
     is found, 0 if none.
+    Otherwise, as soon as one isomorphism is found, the number of isomorphisms is the order of
+    the automorphism group of g (that fixes the vertices in d), which is computed from its
+    generators, see automorphism_order. If <exhaustive> is specified, all isomorphisms are
+    enumerated instead.
     If you want #Aut of a graph, one should create a deep copy of the graph as the second
     argument before calling this function.
+    Pairs of graphs with different signatures are rejected without coloring them together, and
+    forests, connected graphs with pendant trees and graphs with a non-trivial modular
+    decomposition are compared by their encodings, colored cores and decompositions.
+    The optional lists d and i contain vertices of g and h that are mapped onto each other.
+    Optional argument <refine>: the refinement strategy, see the module documentation.
+    Optional argument <selector>: the target cell selector, see the module documentation.
+    Optional argument <jobs>: the number of worker processes, see the module documentation.
+    Optional argument <budget>: the search budget, see anytime.py. If it runs out before the
+    result is known, None is returned.
+
+    The search keeps a single partition of the vertices of both graphs: every level of the
+    search individualizes one pair of vertices, refines from the cell that was split off, and
+    undoes these changes when it backtracks.
     """
 
+    if budget is not None:
+        if jobs is not None and jobs > 1:
+            raise ValueError('search budgets are not supported with worker processes')
+        budget.start()
+    if not exhaustive and not d and not i:
+        num = trees.count_isomorphism(g, h, stop_early)
+        if num is None:
+            num = pendant.count_isomorphism(g, h, stop_early, refine, selector, jobs, budget)
+        if num is None and (budget is None or not budget.exhausted):
+            num = modules.count_isomorphism(g, h, stop_early, refine, selector, jobs, budget)
+        if num is not None or (budget is not None and budget.exhausted):
+            return num
+    if budget is not None:
+        return anytime.count_isomorphism(g, h, d, i, stop_early, refine, selector, exhaustive, budget)
+    if jobs is not None and jobs > 1:
+        return parallel.count_isomorphism(g, h, d, i, stop_early, refine, selector, exhaustive, jobs)
+    if signature(g) != signature(h):
+        return 0
+
+    refine = get_strategy(refine, g, h)
     if d is None:
         d = []
     if i is None:
         i = []
 
-    set_colors(g, d)
-    set_colors(h, i)
-    colors = create_color_dict(g, h)
-
-    if not recolor(colors):  # recolor can return if the coloring is unbalanced
+    p, n, index = _initial_partition(g, h, d, i, refine)
+    if p is None:
         return 0
 
-    if defines_bijection(colors):
-        return 1
+    select, name = get_selector(selector)
+    if stop_early or exhaustive:
+        return _count_isomorphisms(p, n, stop_early, refine, select, name)
 
-    if not is_balanced(colors):  # recolor doesnt always know if the coloring is unbalanced
+    if _count_isomorphisms(p, n, True, refine, select, name) == 0:
         return 0
+    return automorphism_order(g, d, refine, selector)
 
-    # Choose a color class C with |C| ≥ 4
-    # note that c is the list of vertices, not an int representing the color
-    c = None
-    for color in colors.values():
-        if len(color) >= 4:
-            c = color
-            break
 
-    x = None  # vertex of g with color c
-    for v in c:
-        if v._graph is g:
-            x = v
-            break
+def automorphism_order(g, d=None, refine=None, selector=None, jobs=None, budget=None):
+    """
+    Returns the number of automorphisms of graph g that map every vertex in the list d onto
+    itself, computed from the generators found by generate_automorphisms on a copy of g (or for
+    empty d from the encoding of g if it is a forest, from its colored core if it has pendant
+    trees, or from its modular decomposition if that is not trivial, see trees.py, pendant.py and
+    modules.py).
+    The result is cached on the graph if d is empty, and recomputed after vertices or edges
+    are added or the vertices are recolored.
+    Optional argument <jobs>: the number of worker processes, see the module documentation.
+    Optional argument <budget>: the search budget, see anytime.py. If it runs out, the result is
+    the order of the group generated by the automorphisms found so far, a lower bound.
+    """
+    if d is None:
+        d = []
+    if budget is not None:
+        budget.start()
+    key = cache_key(g, colors=True)
+    cached = getattr(g, '_automorphism_order', None)
+    if len(d) == 0 and cached is not None and cached[0] == key:
+        return cached[1]
+
+    order = None
+    if len(d) == 0:
+        order = trees.automorphism_order(g)
+    if order is None and len(d) == 0:
+        order = pendant.automorphism_order(g, refine, selector, jobs, budget)
+        if order is None:
+            order = modules.automorphism_order(g, refine, selector, jobs, budget)
+    if order is None:
+        gCopy = g.clone()
+        index = {}
+        for v in g._V:
+            index[v] = len(index)
+        x = []
+        generate_automorphisms(g, gCopy, d, [gCopy._V[index[v]] for v in d], x, refine=refine, selector=selector, jobs=jobs, budget=budget)
+        order = permgrputil.order(x)
+
+    if len(d) == 0 and (budget is None or not budget.exhausted):
+        g._automorphism_order = (key, order)
+    return order
+
+
+def _initial_partition(g, h, d, i, refine):
+    """
+    Returns a tuple (p, n, index): the refined partition <p> of the vertices of g and h, starting
+    from their colornums, in which the vertices in d and i are individualized, the number of vertices n of g, and the dictionary
+    <index> that gives the number of every vertex in the partition (the vertices of g are
+    numbered 0...n-1).
+    If this coloring is unbalanced, p is None.
+    """
+    vertices, index, nbs = pair_adjacency(g, h)
+    n = len(g._V)
+    if len(vertices) != 2 * n:
+        return None, n, index
+
+    cells = color_cells(vertices, n)
+    if cells is None:
+        return None, n, index
+    p = partition(nbs, cells, n)
+    if not refine(p, list(cells)):
+        return None, n, index
+
+    for k in range(len(d)):
+        x = index[d[k]]
+        y = index[i[k]]
+        c = p.cellof[x]
+        if p.cellof[y] != c:
+            return None, n, index
+        if p.end[c] - p.start[c] > 2 and not _individualize(p, c, x, y, refine):
+            return None, n, index
+
+    return p, n, index
+
+
+def color_cells(vertices, n=None):
+    """
+    Returns the cells that a partition of <vertices> starts with: a dictionary from cell numbers
+    to lists of numbers of the vertices (their indices in the list) that have the same colornum,
+    numbered in the order of the colornums, so that the numbering does not depend on the order
+    of the vertices. If <n> is given, the first n vertices belong to one graph and the others
+    to a second graph, and None is returned if a color has more vertices in one of them.
+    """
+    classes = {}
+    for k in range(len(vertices)):
+        color = vertices[k].colornum
+        if color in classes:
+            classes[color].append(k)
+        else:
+            classes[color] = [k]
+    if len(classes) <= 1:
+        return {0: list(range(len(vertices)))}
+
+    cells = {}
+    for color in sorted(classes):
+        members = classes[color]
+        if n is not None and 2 * sum(1 for k in members if k < n) != len(members):
+            return None
+        cells[len(cells)] = members
+    return cells
+
+
+def _individualize(p, c, x, y, refine):
+    """
+    Splits vertex <x> of the first graph and vertex <y> of the second graph off cell <c> of the
+    partition <p> into a new cell, and refines from that cell.
+    Returns False iff the coloring becomes unbalanced.
+    """
+    return refine(p, p.split(c, [x, y]))
 
-    num = 0
-    for y in c:
-        if y._graph is h:
-            num += count_isomorphism(g, h, d + [x], i + [y], stop_early=stop_early)
-            if stop_early:
-                if num > 0:  # found isomorphism, no need to continue if we dont care about the amount
-                    return num
 
-    return num
+def first_cell(p):
+    """
+    Returns the first cell of <p> with at least 4 vertices, or None.
+    """
+    for c in range(len(p.start)):
+        if p.end[c] - p.start[c] >= 4:
+            return c
+    return None
 
 
-def is_balanced(colors):
-    for vertices in colors.values():
-        if len(vertices) != 0:
-            num0 = 0  # amount of vertices in graph0
-            num1 = 0  # amount of vertices in the other graph
-            graph0 = vertices[0]._graph
+def smallest_cell(p):
+    """
+    Returns the smallest cell of <p> with at least 4 vertices, or None.
+    """
+    best = None
+    for c in range(len(p.start)):
+        size = p.end[c] - p.start[c]
+        if size >= 4 and (best is None or size < p.end[best] - p.start[best]):
+            best = c
+            if size == 4:
+                break
+    return best
 
-            for vertex in vertices:
-                if vertex._graph is graph0:
-                    num0 += 1
-                else:
-                    num1 += 1
 
-            if num0 != num1:
-                return False
+def largest_cell(p):
+    """
+    Returns the largest cell of <p> with at least 4 vertices, or None.
+    """
+    best = None
+    for c in range(len(p.start)):
+        size = p.end[c] - p.start[c]
+        if size >= 4 and (best is None or size > p.end[best] - p.start[best]):
+            best = c
+    return best
 
-    return True
 
+def most_adjacent_cell(p):
+    """
+    Returns the cell of <p> with at least 4 vertices that is non-trivially joined to the most
+    cells with at least 4 vertices, or None. Cell c is non-trivially joined to cell d if the
+    vertices of c are adjacent to some, but not all vertices of d in the same graph. (Because
+    the partition is equitable, this is the same for all vertices of c.)
+    """
+    nbs = p.nbs
+    cellof = p.cellof
+    best = None
+    best_joined = -1
+    for c in range(len(p.start)):
+        if p.end[c] - p.start[c] >= 4:
+            counts = {}
+            for u in nbs[p.elements[p.start[c]]]:
+                d = cellof[u]
+                counts[d] = counts.get(d, 0) + 1
+            joined = 0
+            for d in counts:
+                size = p.end[d] - p.start[d]
+                if size >= 4 and 2 * counts[d] < size:
+                    joined += 1
+            if joined > best_joined:
+                best = c
+                best_joined = joined
+    return best
+
+
+SELECTORS = {
+    'first': first_cell,
+    'smallest': smallest_cell,
+    'largest': largest_cell,
+    'adjacent': most_adjacent_cell,
+}
+
+# the number of search nodes for every selector (by name), see get_selector
+nodes = {}
+
+
+def get_selector(selector):
+    """
+    Returns a tuple (select, name) for the <selector> argument of the search functions (see the
+    module documentation): the selector function, and the name under which its number of search
+    nodes is counted in <nodes>.
+    """
+    if selector is None:
+        selector = 'first'
+    if isinstance(selector, str):
+        if selector not in SELECTORS:
+            raise ValueError('unknown target cell selector: ' + selector)
+        return SELECTORS[selector], selector
+    return selector, selector.__name__
 
-def defines_bijection(colors):
-    for vertices in colors.values():
-        if len(vertices) != 2:  # found a color with #vertices != 2
-            return False
 
-        if vertices[0]._graph is vertices[1]._graph:  # both vertices belong to same graph, no bijection
-            return False
+def _count_isomorphisms(p, n, stop_early, refine, select, name, budget=None):
+    """
+    Counts the isomorphisms that extend the balanced, refined partition <p>, branching on the
+    cells chosen by <select>, and adds the number of search nodes to nodes[name].
+    Every node is charged to <budget> (if any); when it runs out, the search stops and hands the
+    subtrees it did not finish to budget.stop, see _frontier.
+    The search tree is traversed with an explicit stack instead of recursion: for every level of
+    the current path, the arrays below hold the target cell, the individualized vertex of g, the
+    candidate vertices of h, the index of the next candidate, and the marker to undo the
+    individualization of the current candidate. A path has at most n levels.
+    """
+    cells = [0] * n
+    xs = [0] * n
+    candidates = [None] * n
+    nexts = [0] * n
+    markers = [0] * n
 
-    return True
+    num = 0
+    count = 0
+    depth = -1
+    descend = True
+    while True:
+        if descend:
+            count += 1
+            if budget is not None and budget.spend():
+                budget.stop(_frontier(xs, candidates, nexts, depth))
+                if depth >= 0:
+                    p.undo(markers[0])
+                nodes[name] = nodes.get(name, 0) + count
+                return num
+            if len(p.start) == n:  # every cell consists of one vertex of both graphs
+                num += 1
+                if stop_early:  # found isomorphism, no need to continue if we dont care about the amount
+                    if depth >= 0:
+                        p.undo(markers[0])
+                    nodes[name] = nodes.get(name, 0) + count
+                    return num
+            else:
+                # Choose a color class C with |C| ≥ 4
+                depth += 1
+                c = select(p)
+                members = p.members(c)
+                cells[depth] = c
+                for v in members:
+                    if v < n:  # vertex of g with color c
+                        xs[depth] = v
+                        break
+                candidates[depth] = [y for y in members if y >= n]
+                nexts[depth] = 0
+
+        # continue with the next candidate on the deepest level that has one
+        descend = False
+        while depth >= 0:
+            k = nexts[depth]
+            if k > 0:
+                p.undo(markers[depth])
+            if k == len(candidates[depth]):
+                depth -= 1
+                continue
+            nexts[depth] = k + 1
+            markers[depth] = p.mark()
+            if _individualize(p, cells[depth], xs[depth], candidates[depth][k], refine):
+                descend = True
+                break
 
+        if depth < 0:
+            nodes[name] = nodes.get(name, 0) + count
+            return num
 
-def generate_automorphisms(graph, gCopy, verticesD, verticesI, x, firstPruningRule = True, secondPruningRule = True, membershipTesting = False):
+
+def _frontier(xs, candidates, nexts, depth):
+    """
+    Returns the subtrees that a search with an explicit stack has not finished, in the order in
+    which it would have searched them: the current node and the candidates that are left on every
+    level of its path, each as the list of pairs of vertex numbers individualized below the root.
+    """
+    path = [(xs[k], candidates[k][nexts[k] - 1]) for k in range(depth + 1)]
+    frontier = [path]
+    for k in range(depth, -1, -1):
+        for y in candidates[k][nexts[k]:]:
+            frontier.append(path[:k] + [(xs[k], y)])
+    return frontier
+
+
+def generate_automorphisms(graph, gCopy, verticesD, verticesI, x, firstPruningRule = True, secondPruningRule = True, membershipTesting = False, refine = None, selector = None, orbitPruning = True, jobs = None, budget = None):
     """
     Requires arguments gCopy to be a deepcopy of graph, parameters d, i and x should be []
     return type is irrelevant for the working principle of this function, that is reserved for internal purposes only.
+    Optional argument <refine>: the refinement strategy, see the module documentation.
+    Optional argument <selector>: the target cell selector, see the module documentation.
+    Optional argument <orbitPruning>: skip the vertices of gCopy that are in the same orbit as a
+    vertex that was already tried at the same node, under the automorphisms found so far that fix
+    the vertices of gCopy that are already individualized, see _generate_automorphisms.
+    Optional argument <jobs>: the number of worker processes, see the module documentation.
+    Optional argument <budget>: the search budget, see anytime.py.
+    If no vertices are individualized, the generators of a forest are computed from its encoding
+    (see trees.py), those of a graph that is not connected or has a complement that is not
+    connected from its parts (see components.py), and those of a graph with twins from its
+    reduced graph (see twins.py).
+    """
+    if budget is not None:
+        if jobs is not None and jobs > 1:
+            raise ValueError('search budgets are not supported with worker processes')
+        budget.start()
+    if not verticesD and not verticesI:
+        if trees.generate_automorphisms(graph, x):
+            return True
+        if components.generate_automorphisms(graph, x, firstPruningRule, secondPruningRule, membershipTesting, refine, selector, orbitPruning, jobs, budget):
+            return True
+        if twins.generate_automorphisms(graph, x, firstPruningRule, secondPruningRule, membershipTesting, refine, selector, orbitPruning, jobs, budget):
+            return True
+    if budget is not None:
+        return anytime.generate_automorphisms(graph, gCopy, verticesD, verticesI, x, firstPruningRule, secondPruningRule, membershipTesting, refine, selector, orbitPruning, budget)
+    if jobs is not None and jobs > 1:
+        return parallel.generate_automorphisms(graph, gCopy, verticesD, verticesI, x, firstPruningRule, secondPruningRule, membershipTesting, refine, selector, orbitPruning, jobs)
+    return _search_automorphisms(graph, gCopy, verticesD, verticesI, x, firstPruningRule, secondPruningRule, membershipTesting, refine, selector, orbitPruning)
+
+
+def _search_automorphisms(graph, gCopy, verticesD, verticesI, x, firstPruningRule, secondPruningRule, membershipTesting, refine, selector, orbitPruning, budget=None):
     """
-    
-    # set original colors, only based on D and I
-    set_colors(graph, verticesD)
-    set_colors(gCopy, verticesI)
-    colors = create_color_dict(graph, gCopy)
+    The sequential search of generate_automorphisms, which charges its nodes to <budget> (if any).
+    """
+    refine = get_strategy(refine, graph, gCopy)
 
-    if not recolor(colors):  # recolor can return if the coloring is unbalanced
-        return False
-    if not is_balanced(colors):  # recolor doesnt always know if the coloring is unbalanced
+    p, n, index = _initial_partition(graph, gCopy, verticesD, verticesI, refine)
+    if p is None:
         return False
 
-    # unique automorphism
-    if defines_bijection(colors):
-        mapping = list(range(0, len(graph._V)))
-        for i in range(0, len(colors)):
-            if colors[i][0] in graph:
-                mapping[colors[i][0]._label] = colors[i][1]._label
+    # calculate whether D, I is trivial, used for second pruning rule
+    trivial = True
+    if secondPruningRule:
+        for i in range(0, len(verticesD)):
+            if verticesD[i]._label != verticesI[i]._label:
+                trivial = False
+                break
+
+    vertices = graph._V + gCopy._V
+    select, name = get_selector(selector)
+    fixed = [v._label for v in verticesI] if orbitPruning else None
+    return _generate_automorphisms(p, vertices, n, trivial, x, firstPruningRule, secondPruningRule, membershipTesting, refine, select, name, fixed, budget)
+
+
+def _generate_automorphisms(p, vertices, n, trivial, x, firstPruningRule, secondPruningRule, membershipTesting, refine, select, name, fixed, budget=None):
+    """
+    Adds generators for the automorphisms that extend the balanced, refined partition <p> to x,
+    branching on the cells chosen by <select>, and adds the number of search nodes to nodes[name].
+    <trivial> tells whether the individualized vertices are mapped onto vertices with the same label.
+    The search tree is traversed with an explicit stack, as in _count_isomorphisms; <result> is
+    the return value of the last node that was finished (True if it found an automorphism and
+    returns to its last trivial ancestor).
+
+    If <fixed> is not None (the labels of the individualized vertices of gCopy), orbit pruning is
+    used at every node: if the vertex newEl of graph has been mapped onto w, it does not have to
+    be mapped onto v if an automorphism in the pointwise stabilizer of the vertices of gCopy that
+    are already individualized maps w onto v. Either automorphisms for both choices are found
+    (and generated) from the one for w, or there are none for both. The generators in x that fix
+    these vertices generate part of that stabilizer, and for every node the generators used
+    (<stabilizers>), the number of generators in x that were checked (<checked>), the labels
+    of the vertices that were tried (<tried>) and the union of their orbits (<covered>) are kept.
+
+    Every node is charged to <budget> (if any), as in _count_isomorphisms. The vertices that are
+    left on a level and are covered by the orbits of the tried vertices are not part of the
+    frontier: the subtree of the tried vertex is part of it, or it was finished.
+    """
+    cols = [0] * n
+    newEls = [0] * n
+    labels = [0] * n
+    checklists = [None] * n
+    nexts = [0] * n
+    markers = [0] * n
+    trivials = [False] * n
+    if fixed is not None:
+        fixed = fixed + [0] * n
+        base = len(fixed) - n
+        stabilizers = [None] * n
+        checked = [0] * n
+        tried = [None] * n
+        covered = [None] * n
+
+    # returns the orbit of an generating set and a specific element, used for the second pruning rule;
+    # orbits are kept until generators are added to x
+    orbits = {}
+
+    def get_orbit(x, label):
+        if len(x) == 0:
+            return [label]
+        if label not in orbits or orbits[label][0] != len(x):
+            orbits[label] = (len(x), set(Orbit(x, label)))
+        return orbits[label][1]
+
+    result = False
+    count = 0
+    depth = -1
+    descend = True
+    while True:
+        if descend:
+            count += 1
+            if budget is not None and budget.spend():
+                if fixed is not None:
+                    for k in range(depth + 1):
+                        _update_orbits(x, fixed, base + k, k, stabilizers, checked, tried, covered)
+                        checklists[k] = checklists[k][:nexts[k]] + [v for v in checklists[k][nexts[k]:] if vertices[v]._label not in covered[k]]
+                budget.stop(_frontier(newEls, checklists, nexts, depth))
+                if depth >= 0:
+                    p.undo(markers[0])
+                nodes[name] = nodes.get(name, 0) + count
+                return False
+            # unique automorphism
+            if len(p.start) == n:
+                mapping = list(range(0, n))
+                for c in range(0, n):
+                    a, b = p.members(c)
+                    if a >= n:
+                        a, b = b, a
+                    mapping[vertices[a]._label] = vertices[b]._label
+
+                # add to generating set (assuming we return to trivial node, by pruning rule #1)
+                perm = permutation(len(mapping), mapping=mapping)
+                if mapping != list(range(0, len(mapping))):
+                    if not membershipTesting or not permgrputil.is_member(perm, x): # membership testing?
+                        x.append(perm)
+
+                result = True  # return to last visited trivial ancestor (if firstpruningRule)
             else:
-                mapping[colors[i][1]._label] = colors[i][0]._label
+                depth += 1
+                cols[depth] = select(p)
+                _automorphism_target(p, vertices, n, cols[depth], depth, newEls, labels, checklists)
+                nexts[depth] = 0
+                trivials[depth] = trivial
+                if fixed is not None:
+                    stabilizers[depth] = []
+                    checked[depth] = 0
+                    tried[depth] = []
+                    covered[depth] = set()
+
+        # continue with the next candidate on the deepest level that has one
+        descend = False
+        while depth >= 0:
+            k = nexts[depth]
+            if k > 0:
+                p.undo(markers[depth])
+                if firstPruningRule and result and not trivials[depth]:  # return to last trivial ancestor
+                    depth -= 1  # not trivial, return to last trivial ancestor
+                    continue
+
+            checklist = checklists[depth]
+            label = labels[depth]
+            nodeTrivial = trivials[depth]
+            if fixed is not None:
+                _update_orbits(x, fixed, base + depth, depth, stabilizers, checked, tried, covered)
+            while k < len(checklist):
+                w = vertices[checklist[k]]._label
+                # this version of the second pruning rule only applies to branches of a trivial mapping,
+                # otherwise it should not be applied checkes whether the automorphism created with mapping newEl
+                # to (non trivial!) v is already produces by the generating set
+                if secondPruningRule and nodeTrivial and label != w and w in get_orbit(x, label):
+                    k += 1
+                elif fixed is not None and w in covered[depth]:
+                    k += 1
+                else:
+                    break
+            if k == len(checklist):
+                result = False  # No automorphism found
+                depth -= 1
+                continue
+
+            v = checklist[k]
+            nexts[depth] = k + 1
+            if fixed is not None:
+                fixed[base + depth] = vertices[v]._label
+                tried[depth].append(vertices[v]._label)
+                if len(stabilizers[depth]) == 0:
+                    covered[depth].add(vertices[v]._label)
+                else:
+                    covered[depth].update(Orbit(stabilizers[depth], vertices[v]._label))
+            trivial = nodeTrivial and (not secondPruningRule or label == vertices[v]._label)
+            markers[depth] = p.mark()
+            result = False
+            if _individualize(p, cols[depth], newEls[depth], v, refine):
+                descend = True
+                break
 
-        # print(mapping)
-        # add to generating set (assuming we return to trivial node, by pruning rule #1)
-        perm = permutation(len(mapping), mapping=mapping)
-        if mapping != list(range(0, len(mapping))):
-            if not membershipTesting or not permgrputil.is_member(perm, x): # membership testing?
-                x.append(perm)
+        if depth < 0:
+            nodes[name] = nodes.get(name, 0) + count
+            return result
 
-        
-        return True  # return to last visited trivial ancestor (if firstpruningRule)
 
-    # multiple automorphisms
+def _update_orbits(x, fixed, size, depth, stabilizers, checked, tried, covered):
+    """
+    Adds the generators in x that were found since the last call for level <depth> of
+    _generate_automorphisms and that fix the labels fixed[0:size] to stabilizers[depth], and if
+    there are any, recomputes the union covered[depth] of the orbits of the tried labels.
+    """
+    new = []
+    for perm in x[checked[depth]:]:
+        for k in range(size):
+            if perm[fixed[k]] != fixed[k]:
+                break
+        else:
+            new.append(perm)
+    checked[depth] = len(x)
+    if len(new) > 0:
+        stabilizers[depth] += new
+        for label in tried[depth]:
+            if label not in covered[depth]:
+                covered[depth].update(Orbit(stabilizers[depth], label))
 
-    # Choose a color class C with |C| ≥ 4
-    col = None
+
+def _automorphism_target(p, vertices, n, col, depth, newEls, labels, checklists):
+    """
+    Chooses the individualized vertex of graph in the target cell <col> for the search node on
+    level <depth> of _generate_automorphisms, and the list of vertices of gCopy to map it onto.
+    """
+    # Choose a vertex of graph in C, preferably one with the same label as a vertex of gCopy in C
+    members = p.members(col)
+    labels_h = set()
+    for v in members:
+        if v >= n:
+            labels_h.add(vertices[v]._label)
     newEl = None
-    instBreak = False
-    for color in colors.values():
-        if len(color) >= 4:
-            col = color
-            for v1 in col:
-                if v1._graph is graph:
-                    for v2 in col:
-                        if v2._graph is gCopy and v1._label == v2._label:
-                            newEl = v1
-                            instBreak = True
-                            break
-                    if instBreak:
-                        break
-            if instBreak:
-                break
+    for v in members:
+        if v < n and vertices[v]._label in labels_h:
+            newEl = v
+            break
 
-    # no trivial color has been found, thus no vertex with trivial option can be selected either
+    # no trivial option has been found
     if newEl is None:
-        for v in col:
-            if v._graph is graph:
+        for v in members:
+            if v < n:
                 newEl = v
                 break
 
     # build list of vertices of gCopy to check, while also looking for a similar node as newEl
     # this guarantees that it starts with the trivial node, if possible
+    label = vertices[newEl]._label
     checklist = []
-    checklist_append = checklist.append
-    for v in col:
-        if v._graph is gCopy:
-            checklist_append(v)
-            if v._label == newEl._label:
+    for v in members:
+        if v >= n:
+            checklist.append(v)
+            if vertices[v]._label == label:
                 checklist[0], checklist[len(checklist) - 1] = v, checklist[0]
 
-    # returns the orbit of an generating set and a specific element, used for the second pruning rule
-    def get_orbit(x, label):
-        if len(x) == 0:
-            return [label]
-        return Orbit(x, label)
-
-    # calculate whether D, I is trivial, used for second pruning rule
-    trivial = True
-    if secondPruningRule:
-        for i in range(0, len(verticesD)):
-            if verticesD[i]._label != verticesI[i]._label:
-                trivial = False
-                break
-
-    for v in checklist:
-        # this version of the second pruning rule only applies to branches of a trivial mapping,
-        # otherwise it should not be applied checkes whether the automorphism created with mapping newEl
-        # to (non trivial!) v is already produces by the generating set
-        if (not trivial or not secondPruningRule) or (newEl._label == v._label) or (not v._label in get_orbit(x, newEl._label)):
-            res = generate_automorphisms(graph, gCopy, verticesD + [newEl], verticesI + [v], x, firstPruningRule, secondPruningRule, membershipTesting)
-            if firstPruningRule and res and not trivial:  # return to last trivial ancestor
-                return True  # not trivial, return to last trivial ancestor
-
-    # No automorphism found
-    return False
-
-
-def count_automorphisms(graph, graphCopy):
+    newEls[depth] = newEl
+    labels[depth] = label
+    checklists[depth] = checklist
+
+
+def count_automorphisms(graph, graphCopy, refine=None, selector=None, jobs=None, budget=None):
+    if budget is not None:
+        budget.start()
+    order = trees.automorphism_order(graph)
+    if order is not None:
+        return order
+    order = pendant.automorphism_order(graph, refine, selector, jobs, budget)
+    if order is None:
+        order = modules.automorphism_order(graph, refine, selector, jobs, budget)
+    if order is not None:
+        return order
     x = []
-    generate_automorphisms(graph, graphCopy, [], [], x)
+    generate_automorphisms(graph, graphCopy, [], [], x, refine=refine, selector=selector, jobs=jobs, budget=budget)
 
     return permgrputil.order(x)
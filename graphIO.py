@@ -15,6 +15,7 @@ This module also supports edge weighted graphs: edges should/will have an (integ
 # Version: 30-01-2015, Paul Bonsma
 # updated 30-01-2015: writeDOT also writes color information for edges.
 # updated 2-2-2015: writeDOT can also write directed graphs.
+# updated 18-10-2026: readgraph uses graphclass.from_edge_list when available.
 
 import basicgraphs
 
@@ -25,13 +26,14 @@ numcolors = 12
 def readgraph(graphclass, readline):
     """
     For internal use.
+    If <graphclass> has a from_edge_list method, the graph is built with a single call
+    to it; otherwise the edges are added one by one with addedge.
     """
     options = []
     while True:
         try:
             S = readline()
             n = int(S)
-            G = graphclass(n)
             break
         except ValueError:
             if len(S) > 0 and S[-1] == '\n':
@@ -40,22 +42,33 @@ def readgraph(graphclass, readline):
                 options.append(S)
     S = readline()
     edgelist = []
+    weights = []
+    hasweights = False
     try:
         while True:
             comma = S.find(',')
             if ':' in S:
                 colon = S.find(':')
-                edgelist.append((int(S[:comma]), int(S[comma + 1:colon]), int(S[colon + 1:])))
+                edgelist.append((int(S[:comma]), int(S[comma + 1:colon])))
+                weights.append(int(S[colon + 1:]))
+                hasweights = True
             else:
-                edgelist.append((int(S[:comma]), int(S[comma + 1:]), None))
+                edgelist.append((int(S[:comma]), int(S[comma + 1:])))
+                weights.append(None)
             S = readline()
     except Exception:
         pass
-    for edge in edgelist:
-        # print("Adding edge (%d,%d)"%(edge[0],edge[1]))
-        e = G.addedge(G[edge[0]], G[edge[1]])
-        if edge[2] != None:
-            e.weight = edge[2]
+    if not hasweights:
+        weights = None
+    if hasattr(graphclass, 'from_edge_list'):
+        G = graphclass.from_edge_list(n, edgelist, weights)
+    else:
+        G = graphclass(n)
+        for k in range(len(edgelist)):
+            # print("Adding edge (%d,%d)"%(edgelist[k][0],edgelist[k][1]))
+            e = G.addedge(G[edgelist[k][0]], G[edgelist[k][1]])
+            if weights is not None and weights[k] != None:
+                e.weight = weights[k]
     if S != '' and S[0] == '-':
         return G, options, True
     else:
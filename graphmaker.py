@@ -28,11 +28,9 @@ def complete(n):
 
 
 def disjoint_union(g, h):
-    gh = graph()
     vertices = {}
 
     for v in g.V() + h.V():
-        vertices[v] = gh.addvertex()
-    for e in g.E() + h.E():
-        gh.addedge(vertices[e.head()], vertices[e.tail()])
-    return gh
+        vertices[v] = len(vertices)
+    pairs = [(vertices[e.head()], vertices[e.tail()]) for e in g.E() + h.E()]
+    return graph.from_edge_list(len(vertices), pairs)
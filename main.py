@@ -1,5 +1,12 @@
 from gi import *
+from canon import certificate
+import parallel
+from anytime import budget
 import graphIO
+import basicgraphs
+import vrecolor
+import wl2
+from csrgraph import csrgraph
 
 # sys is used for argument parsing and time for benchmarking
 # neither imports are used for the actual algorithms
@@ -8,22 +15,29 @@ from time import time
 import sys
 
 
-def print_isomorphisms(path):
-    graphs = graphIO.loadgraph(path, readlist=True)[0]
-
-    checked_pairs = []
-    isomorphic_pairs = []
+def print_isomorphisms(path, graphclass=basicgraphs.graph, refine=None, selector=None, jobs=None):
+    #jobs : the number of worker processes that compute the certificates (None to compute them in this process)
+    graphs = graphIO.loadgraph(path, graphclass=graphclass, readlist=True)[0]
 
+    # two graphs are isomorphic iff they have the same certificate (see canon.py),
+    # so the graphs are put into classes by their certificates instead of testing all pairs
+    if jobs is not None and jobs > 1:
+        certificates = parallel.certificates(graphs, refine=refine, selector=selector, jobs=jobs)
+    else:
+        certificates = [certificate(g, refine=refine, selector=selector) for g in graphs]
+    classes = {}
     for i in range(len(graphs)):
-        for j in range(len(graphs)):
-            g = graphs[i]
-            h = graphs[j]
+        c = certificates[i]
+        if c not in classes:
+            classes[c] = []
+        classes[c].append(i)
 
-            pair = (i, j)
-            if i != j and not (j, i) in checked_pairs:  # do not do automorphisms, do not do pairs twice
-                if count_isomorphism(g, h, stop_early=True) > 0:
-                    isomorphic_pairs.append(pair)
-                checked_pairs.append(pair)
+    isomorphic_pairs = []
+    for members in classes.values():
+        for i in members:
+            for j in members:
+                if i < j:
+                    isomorphic_pairs.append((i, j))
 
     isomorphic_pairs.sort()
     print("╔════════════════╗")
@@ -35,14 +49,19 @@ def print_isomorphisms(path):
     print("╚════════════════╝")
 
 
-def print_automorphisms(path, optimize_iso=False):
+def print_automorphisms(path, optimize_iso=False, graphclass=basicgraphs.graph, refine=None, selector=None, jobs=None, limit=None):
     #optimize_iso : optimize by reusing results of isomorphic graps
+    #graphclass : the graph class used to store the graphs, e.g. csrgraph for large inputs
+    #refine : the refinement strategy, e.g. 'vector' (None to select one for every pair of graphs)
+    #selector : the target cell selector, e.g. 'smallest' (None for 'first')
+    #jobs : the number of worker processes of every search (None to search in this process)
+    #limit : the number of seconds of every search (None for no limit), see anytime.py;
+    #        a number of automorphisms that is not known within the limit is printed as a lower bound
     
-    # count_isomorphisms requires that the given graphs are separate instances
-    # one could load a graph and make a deep copy, however, since no modules may
-    # be imported it is easier to load the graphs twice
-    graphs1 = graphIO.loadgraph(path, readlist=True)[0]
-    graphs2 = graphIO.loadgraph(path, readlist=True)[0]
+    # count_automorphisms requires that the given graphs are separate instances,
+    # so every graph is cloned instead of parsing the file a second time
+    graphs1 = graphIO.loadgraph(path, graphclass=graphclass, readlist=True)[0]
+    graphs2 = [g.clone() for g in graphs1]
     
     cache = {}
     
@@ -57,7 +76,8 @@ def print_automorphisms(path, optimize_iso=False):
 
                 pair = (i, j)
                 if i != j and not (j, i) in checked_pairs:  # do not do automorphisms, do not do pairs twice
-                    if count_isomorphism(g, h, stop_early=True) > 0:
+                    b = None if limit is None else budget(seconds=limit)
+                    if count_isomorphism(g, h, stop_early=True, refine=refine, selector=selector, jobs=jobs, budget=b):  # None if unknown
                         isomorphic_pairs.append(pair)
                     checked_pairs.append(pair)
     
@@ -74,7 +94,10 @@ def print_automorphisms(path, optimize_iso=False):
                     break
         
         if(aut == -1):
-            aut = count_automorphisms(graphs1[i], graphs2[i])
+            b = None if limit is None else budget(seconds=limit)
+            aut = count_automorphisms(graphs1[i], graphs2[i], refine=refine, selector=selector, jobs=jobs, budget=b)
+            if b is not None and b.exhausted:
+                aut = ">=" + str(aut)
         
         if(optimize_iso):
             cache[i] = aut
@@ -99,11 +122,10 @@ def check_automorphisms_generators_time(name='test_2/cubes6.grl', id=-1, firstPr
 
 
 def check_automorphisms_generators(name='test_2/cubes6.grl', id=-1, firstPruningRule=True, secondPruningRule=True, membershipTesting=False):
-    # generate_automorphisms requires that the given graphs are separate instances
-    # one could load a graph and make a deep copy, however, since no modules may
-    # be imported it is easier to load the graphs twice
+    # generate_automorphisms requires that the given graphs are separate instances,
+    # so every graph is cloned instead of parsing the file a second time
     tlist = graphIO.loadgraph('' + name + '', readlist=True)
-    tlist2 = graphIO.loadgraph('' + name + '', readlist=True)
+    tlist2 = ([g.clone() for g in tlist[0]], tlist[1])
 
     ids = [id]
     if id == -1:
@@ -122,24 +144,84 @@ if __name__ == "__main__":
     args = sys.argv[1:]
     
     optimize = False
-    
-    if(args[0] == "-o"):
+    graphclass = basicgraphs.graph
+    refine = None
+
+    selector = None
+    pairs = False
+    count_nodes = False
+    jobs = None
+    limit = None
+
+    while len(args) > 0 and args[0] in ("-o", "-c", "-v", "-s", "-w", "-t", "-n", "-j", "--jobs", "-l"):
+        if args[0] == "-o":
+            optimize = True
+        elif args[0] == "-c":
+            graphclass = csrgraph
+        elif args[0] == "-v":
+            refine = "vector"
+        elif args[0] == "-w":
+            pairs = True
+        elif args[0] == "-n":
+            count_nodes = True
+        elif args[0] == "-t":
+            if len(args) < 2 or args[1] not in ("first", "smallest", "largest", "adjacent"):
+                print("invalid selector")
+                exit(1)
+            selector = args[1]
+            args = args[1:]
+        elif args[0] in ("-j", "--jobs"):
+            if len(args) < 2 or not args[1].isdigit() or int(args[1]) < 1:
+                print("invalid number of jobs")
+                exit(1)
+            jobs = int(args[1])
+            args = args[1:]
+        elif args[0] == "-l":
+            try:
+                limit = float(args[1]) if len(args) > 1 else 0
+            except ValueError:
+                limit = 0
+            if limit <= 0:
+                print("invalid time limit")
+                exit(1)
+            args = args[1:]
+        else:
+            if len(args) < 2 or args[1] not in ("auto", "classic", "hopcroft", "vector"):
+                print("invalid strategy")
+                exit(1)
+            refine = args[1]
+            args = args[1:]
         args = args[1:]
-        optimize = True
-    
+
+    if refine == "vector" and vrecolor.numpy is None:
+        print("the vector strategy requires NumPy")
+        exit(1)
+    if pairs and wl2.numpy is None:
+        print("-w requires NumPy")
+        exit(1)
+    if pairs:
+        refine = (refine or "auto") + "+2wl"
+
     if len(args) != 2:
         print("invalid arguments")
         exit(1)
+    if limit is not None and jobs is not None and jobs > 1:
+        print("a time limit cannot be combined with worker processes")
+        exit(1)
 
     mode = args[0]
     path = args[1]
     if mode == "-i":
-        print_isomorphisms(path)
+        print_isomorphisms(path, graphclass=graphclass, refine=refine, selector=selector, jobs=jobs)
     elif mode == "-a":
-        print_automorphisms(path, optimize_iso=optimize)
+        print_automorphisms(path, optimize_iso=optimize, graphclass=graphclass, refine=refine, selector=selector, jobs=jobs, limit=limit)
     elif mode == "-ia" or mode == "-ai":
-        print_isomorphisms(path)
-        print_automorphisms(path, optimize_iso=optimize)
+        print_isomorphisms(path, graphclass=graphclass, refine=refine, selector=selector, jobs=jobs)
+        print_automorphisms(path, optimize_iso=optimize, graphclass=graphclass, refine=refine, selector=selector, jobs=jobs, limit=limit)
     else:
         print("unknown option")
         exit(1)
+
+    if count_nodes:
+        for name in sorted(nodes):
+            print("Search nodes ({}): {}".format(name, nodes[name]))
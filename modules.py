@@ -0,0 +1,384 @@
+"""
+Modular decomposition, and isomorphism and automorphisms by the decomposition tree.
+
+A module of a graph is a set M of vertices such that every vertex outside M is adjacent to all
+vertices of M or to none of them. The strong modules (those that do not overlap any other module)
+form a tree, the modular decomposition, whose root is the set of all vertices and whose leaves
+are the single vertices. The children of a node with vertices S are:
+ 'parallel': the components of the subgraph on S, if it is not connected,
+ 'series': the co-components of the subgraph on S (the components of its complement), if its
+     complement is not connected,
+ 'prime': otherwise, the maximal modules of the subgraph on S. The quotient graph, with a vertex
+     for every child and an edge between two children iff their vertices are adjacent, has no
+     modules except the trivial ones. See _maximal_modules.
+A cograph is a graph without prime nodes, and its decomposition tree is its cotree.
+
+Isomorphisms map the decomposition tree of a graph onto that of the other graph, so two graphs
+are isomorphic iff their trees get the same code (see _solve): a leaf is coded by its colornum,
+a parallel or series node by the sorted codes of its children, and a prime node by the
+certificate (see canon.py) of its quotient graph with every vertex colored by the code of its
+child. The automorphisms of a parallel or series node permute children with the same code, so
+the order of the automorphism group of the subgraph of a node is the product of those of its
+children, times the factorial of the number of children with the same code for every code, and
+for a prime node times the number of automorphisms of the colored quotient graph (counted by the
+search of gi.py) instead. For a cograph this needs no search at all. With a budget, the searches
+of the quotient graphs are parts of its search (see anytime.part).
+
+gi.count_isomorphism, gi.automorphism_order and gi.count_automorphisms use count_isomorphism and
+automorphism_order when the decomposition of a graph is not trivial, i.e. not a prime root with
+only single vertices as children. Graphs with loops or multiple edges are left to the search.
+"""
+
+from math import factorial
+
+import gi
+import anytime
+import canon
+from basicgraphs import graph
+from partition import adjacency, cached, is_simple, components_of
+
+
+def decomposition(g):
+    """
+    Returns the modular decomposition tree of <g>, or None if <g> has loops or multiple edges.
+    The tree is a list of nodes [kind, vertices, children, edges], parents before their children:
+    <kind> is 'leaf', 'parallel', 'series' or 'prime', <vertices> the list of vertex numbers (see
+    partition.adjacency) of its module, <children> the list of positions of its children in the
+    tree, and for a prime node <edges> the list of pairs of (indices of) adjacent children.
+    """
+    return cached(g, '_decomposition', lambda: _decomposition(g))
+
+
+def _decomposition(g):
+    index, nbs = adjacency(g)
+    return _decompose(nbs) if is_simple(nbs) else None
+
+
+def is_trivial(tree):
+    """
+    Returns True iff the decomposition <tree> has no modules except the single vertices and
+    the set of all vertices.
+    """
+    return len(tree) <= 1 or (tree[0][0] == 'prime' and len(tree[0][2]) == len(tree[0][1]))
+
+
+def count_isomorphism(g, h, stop_early=False, refine=None, selector=None, jobs=None, budget=None):
+    """
+    Returns the number of isomorphisms between graphs g and h (with <stop_early>: 1 if there is
+    one, 0 if not) computed from their decomposition trees, or None if these are both trivial or
+    one of the graphs has loops or multiple edges (or if the <budget> runs out first).
+    The optional arguments are used for the quotient graphs of prime nodes, see gi.py.
+    """
+    tg = decomposition(g)
+    th = decomposition(h)
+    if tg is None or th is None or (is_trivial(tg) and is_trivial(th)):
+        return None
+    if len(g._V) != len(h._V) or is_trivial(tg) or is_trivial(th):
+        return 0
+
+    codes = {}
+    code_g, order = _solve(g, tg, codes, not stop_early, refine, selector, jobs, budget)
+    code_h = _solve(h, th, codes, False, refine, selector, jobs, budget)[0]
+    if budget is not None and budget.exhausted:
+        return None
+    if code_g != code_h:
+        return 0
+    return 1 if stop_early else order
+
+
+def automorphism_order(g, refine=None, selector=None, jobs=None, budget=None):
+    """
+    Returns the number of automorphisms of <g> computed from its decomposition tree (a lower
+    bound if the <budget> runs out), or None if that is trivial or <g> has loops or multiple
+    edges.
+    """
+    tree = decomposition(g)
+    if tree is None or is_trivial(tree):
+        return None
+    return _solve(g, tree, {}, True, refine, selector, jobs, budget)[1]
+
+
+def _solve(g, tree, codes, count, refine, selector, jobs, budget=None):
+    """
+    Returns a tuple (code, order) for the root of the decomposition <tree> of <g>: its code, a
+    number that is equal for the roots of two trees iff their graphs are isomorphic as long as the
+    same dictionary <codes> (from keys of nodes to their codes) is used for both, and if <count>
+    is True the number of automorphisms of <g> (else None). The nodes are handled from the leaves
+    up, in the reverse order of the tree. Nodes with the same key have isomorphic subgraphs, so
+    the order is only counted for the first node of every key. The certificates and searches of
+    the quotient graphs are charged to <budget>. If it runs out, the codes are meaningless: a
+    quotient graph without a certificate gets a key of its own, and one that is not searched
+    counts as 1, so that the order is a lower bound.
+    """
+    node_codes = [0] * len(tree)
+    orders = [1] * len(tree)
+    known = {}
+    for k in range(len(tree) - 1, -1, -1):
+        kind, vertices, children, edges = tree[k]
+        if kind == 'leaf':
+            key = ('leaf', g._V[vertices[0]].colornum)
+        elif kind == 'prime':
+            quotient = graph.from_edge_list(len(children), edges, simple=True)
+            for j in range(len(children)):
+                quotient._V[j].colornum = node_codes[children[j]]
+            key = ('prime', canon.certificate(quotient, refine, selector, budget))
+            if key[1] is None:  # the budget ran out
+                key = ('prime', None, k)
+            if count and key not in known:
+                orders[k] = anytime.part(budget, 'order', quotient, lambda b: gi.count_automorphisms(quotient, quotient.clone(), refine, selector, jobs, b), 1)
+        else:
+            key = (kind, tuple(sorted(node_codes[c] for c in children)))
+            if count and key not in known:
+                multiplicities = {}
+                for c in children:
+                    multiplicities[node_codes[c]] = multiplicities.get(node_codes[c], 0) + 1
+                for m in multiplicities.values():
+                    orders[k] *= factorial(m)
+        if count and key in known:
+            orders[k] = known[key]
+        elif count:
+            for c in children:
+                orders[k] *= orders[c]
+            known[key] = orders[k]
+        if key not in codes:
+            codes[key] = len(codes)
+        node_codes[k] = codes[key]
+    return node_codes[0], (orders[0] if count else None)
+
+
+def _decompose(nbs):
+    """
+    Returns the decomposition tree (see decomposition) of the graph with adjacency lists <nbs>.
+    The nodes are split in the order of the tree, from a list of nodes whose children are not
+    known yet, together with the kind of their parents: the children of a parallel node are
+    connected and those of a series node have a connected complement, so for these only the
+    other search for components is needed.
+    """
+    n = len(nbs)
+    if n == 0:
+        return []
+    tree = [['leaf', list(range(n)), [], None]]
+    inside = [-1] * n  # the position of the node that is split, for its vertices
+    pending = [(0, None)]
+    while len(pending) > 0:
+        k, parent = pending.pop()
+        vertices = tree[k][1]
+        if len(vertices) == 1:
+            continue
+        for v in vertices:
+            inside[v] = k
+
+        kind = 'prime'
+        parts = [vertices]
+        if parent != 'parallel':
+            parts = components_of(nbs, vertices, inside, k, False)
+            if len(parts) > 1:
+                kind = 'parallel'
+        if kind == 'prime' and parent != 'series':
+            parts = components_of(nbs, vertices, inside, k, True)
+            if len(parts) > 1:
+                kind = 'series'
+        edges = None
+        if kind == 'prime':
+            parts, edges = _prime(nbs, vertices, inside, k)
+
+        tree[k][0] = kind
+        tree[k][3] = edges
+        for part in parts:
+            tree[k][2].append(len(tree))
+            pending.append((len(tree), kind))
+            tree.append(['leaf', part, [], None])
+    return tree
+
+
+def _prime(nbs, vertices, inside, k):
+    """
+    Returns a tuple (modules, edges) for the subgraph on <vertices> (the vertices v with
+    inside[v] == k), which is connected and has a connected complement: its maximal modules,
+    and the pairs of indices of adjacent modules in their quotient graph.
+    """
+    local = {}
+    for v in vertices:
+        local[v] = len(local)
+    sub = [[local[u] for u in nbs[v] if inside[u] == k] for v in vertices]
+
+    modules = _maximal_modules(sub)
+    module = [0] * len(sub)
+    for j in range(len(modules)):
+        for v in modules[j]:
+            module[v] = j
+    edges = []
+    for j in range(len(modules)):
+        for u in set(module[u] for u in sub[modules[j][0]]):
+            if j < u:
+                edges.append((j, u))
+    return [[vertices[v] for v in m] for m in modules], edges
+
+
+def _maximal_modules(nbs):
+    """
+    Returns the maximal modules of the graph with adjacency lists <nbs>, which is connected and has
+    a connected complement, as lists of vertices. They partition the vertices.
+
+    For a vertex v of minimum degree, the maximal modules that do not contain v partition the other
+    vertices, and they are found by partition refinement (see _modules_without). Every module that
+    contains v is the union of v and some of these parts. A part Y is forced by a part X if a
+    module that contains v and X also has to contain Y, because Y is adjacent to exactly one of
+    v and X (every part is a module, so this is the same for all vertices of Y). The parts that
+    lie in the maximal module that contains v only force each other, and every other part is a
+    maximal module that forces all parts (the quotient graph of the maximal modules has only
+    trivial modules). So the other maximal modules are the parts in the strongly connected
+    component of the forcing graph that no other component has an edge to.
+    This takes O(m log n) time for n vertices and m edges: the forcing graph has at most m edges
+    between parts that are adjacent, and at most deg(v) edges from every part to the parts that
+    are adjacent to v, which are at most m edges in total as deg(v) is the minimum degree.
+    """
+    n = len(nbs)
+    v = min(range(n), key=lambda u: len(nbs[u]))
+    parts, part = _modules_without(nbs, v)
+
+    near = set(part[u] for u in nbs[v])
+    forced = [[] for x in range(len(parts))]
+    for x in range(1, len(parts)):
+        adjacent = set(part[u] for u in nbs[next(iter(parts[x]))])
+        for y in near:
+            if y != x and y not in adjacent:
+                forced[x].append(y)
+        for y in adjacent:
+            if y != x and y != 0 and y not in near:
+                forced[x].append(y)
+    components = _strong_components(forced, 1)
+
+    component = [0] * len(parts)
+    for j in range(len(components)):
+        for x in components[j]:
+            component[x] = j
+    entered = set()
+    for x in range(1, len(parts)):
+        for y in forced[x]:
+            if component[y] != component[x]:
+                entered.add(component[y])
+    source = min(j for j in range(len(components)) if j not in entered)
+
+    modules = [[v]]
+    for x in range(1, len(parts)):
+        if component[x] == source:
+            modules.append(list(parts[x]))
+        else:
+            modules[0] += parts[x]
+    return modules
+
+
+def _modules_without(nbs, v):
+    """
+    Returns a tuple (parts, part) for the graph with adjacency lists <nbs>: the list of sets
+    of vertices of the partition into {v} (the first part) and the maximal modules that do not
+    contain vertex <v>, and for every vertex the index of its part.
+
+    A set is a module iff no vertex outside it is adjacent to some but not all of its vertices.
+    Starting with {v}, its neighbours and the other vertices, a part is split by the neighbours
+    of every vertex x outside it (x is a pivot), until no part can be split. When a part is split
+    in two, the vertices of the two halves have not been used as pivots for each other: the
+    vertices of the smaller half are used as pivots again, and the smaller half is split by the
+    neighbours that its vertices have in the larger half (separations). A split moves the smaller
+    of the two new parts, so every vertex is moved and used as a pivot O(log n) times.
+    """
+    n = len(nbs)
+    part = [0] * n
+    parts = [{v}]
+    near = set(nbs[v])
+    far = set(range(n)) - near
+    far.discard(v)
+    for members in (near, far):
+        if len(members) > 0:
+            for u in members:
+                part[u] = len(parts)
+            parts.append(members)
+    pivots = list(range(n))
+    separations = []  # sets of vertices to separate from the other vertices of their parts
+
+    def split(y, moved):
+        # moves the vertices <moved> of part y to a new part
+        parts[y] -= moved
+        z = len(parts)
+        for u in moved:
+            part[u] = z
+        parts.append(moved)
+        small, large = (z, y) if len(moved) <= len(parts[y]) else (y, z)
+        pivots.extend(parts[small])
+        groups = {}
+        for a in parts[small]:
+            key = frozenset(u for u in nbs[a] if part[u] == large)
+            if key in groups:
+                groups[key].append(a)
+            else:
+                groups[key] = [a]
+        if len(groups) > 1:
+            separations.extend(list(groups.values())[1:])
+
+    while len(pivots) > 0 or len(separations) > 0:
+        hits = {}
+        if len(separations) > 0:
+            for u in separations.pop():
+                hits.setdefault(part[u], []).append(u)
+        else:
+            x = pivots.pop()
+            for u in nbs[x]:
+                if part[u] != part[x]:
+                    hits.setdefault(part[u], []).append(u)
+        for y in hits:
+            inter = hits[y]
+            if len(inter) < len(parts[y]):
+                inter = set(inter)
+                split(y, inter if 2 * len(inter) <= len(parts[y]) else parts[y] - inter)
+    return parts, part
+
+
+def _strong_components(edges, first):
+    """
+    Returns the strongly connected components of the directed graph on the vertices first...
+    len(edges)-1 with the lists of out-neighbours <edges>, with Tarjan's algorithm on an explicit
+    stack: for every vertex on the path of the depth-first search, the index of its next edge.
+    """
+    n = len(edges)
+    number = [-1] * n
+    low = [0] * n
+    onstack = [False] * n
+    stack = []
+    components = []
+    counter = 0
+    for s in range(first, n):
+        if number[s] >= 0:
+            continue
+        number[s] = low[s] = counter
+        counter += 1
+        stack.append(s)
+        onstack[s] = True
+        path = [(s, 0)]
+        while len(path) > 0:
+            v, k = path[-1]
+            if k < len(edges[v]):
+                path[-1] = (v, k + 1)
+                u = edges[v][k]
+                if number[u] < 0:
+                    number[u] = low[u] = counter
+                    counter += 1
+                    stack.append(u)
+                    onstack[u] = True
+                    path.append((u, 0))
+                elif onstack[u] and number[u] < low[v]:
+                    low[v] = number[u]
+                continue
+            path.pop()
+            if len(path) > 0 and low[v] < low[path[-1][0]]:
+                low[path[-1][0]] = low[v]
+            if low[v] == number[v]:
+                component = []
+                while True:
+                    u = stack.pop()
+                    onstack[u] = False
+                    component.append(u)
+                    if u == v:
+                        break
+                components.append(component)
+    return components
@@ -0,0 +1,333 @@
+"""
+Parallel search, with a pool of worker processes (multiprocessing).
+
+The subtrees below the nodes on the first one or two levels of the search tree are independent
+subproblems: such a node is identified by the lists d and i of vertices of g and h that are
+individualized on the path to it, and gi.count_isomorphism(g, h, d, i) and
+gi.generate_automorphisms(g, gCopy, d, i, x) search exactly the subtree below it.
+ - count_isomorphism expands the first level of the search (or the first two levels, if the first
+   one has fewer nodes than there are workers), and sums the numbers of isomorphisms of the
+   subtrees. With <stop_early>, the workers are stopped as soon as one of them finds an
+   isomorphism.
+ - generate_automorphisms hands the vertices of gCopy that the individualized vertex of graph is
+   mapped onto at the root to the workers, and adds the generators found by the workers to x as
+   they come in. A vertex is only handed out if it is not in the orbit of a vertex that was
+   already handed out, under the generators found so far (with the pruning rules of
+   gi.generate_automorphisms).
+
+certificates computes the certificates (see canon.py) of a list of graphs, one graph per task, and
+returns them in the order of the list.
+
+Every worker builds its own copy of the graphs once (see pack), so the search does not share
+any state between processes. The number of search nodes of the workers is added to gi.nodes.
+With a start method other than 'fork', the <refine> and <selector> arguments have to be names or
+module-level functions, so that they can be sent to the workers.
+"""
+
+import multiprocessing
+import queue
+
+import gi
+import canon
+import permgrputil
+from permv2 import permutation
+from basicpermutationgroup import Orbit
+
+
+def pack(graph):
+    """
+    Returns a compact representation of <graph> that can be sent to another process: its class,
+    its number of vertices, the labels and colornums of its vertices and the pairs of indices (in
+    the vertex list) of the end points of its edges. See unpack.
+    """
+    if hasattr(graph, '_tails'):  # csrgraph: the edges are already stored as pairs of ids
+        pairs = list(zip(graph._tails, graph._heads))
+    else:
+        index = {}
+        for v in graph._V:
+            index[v] = len(index)
+        pairs = [(index[e._tail], index[e._head]) for e in graph._E]
+    return type(graph), len(graph._V), [v._label for v in graph._V], [v.colornum for v in graph._V], pairs, graph._simple
+
+
+def unpack(packed):
+    """
+    Returns a new graph from the result of pack.
+    """
+    graphclass, n, labels, colors, pairs, simple = packed
+    graph = graphclass.from_edge_list(n, pairs, simple=simple)
+    for k in range(n):
+        graph._V[k]._label = labels[k]
+        graph._V[k].colornum = colors[k]
+    graph._nextlabel = max(labels) + 1 if n > 0 else 0
+    return graph
+
+
+# the graphs and search options of a worker process, see _init_worker
+_graphs = None
+_options = None
+
+
+def _init_worker(packed, options):
+    """
+    Builds the graphs of a worker process from their packed representations.
+    """
+    global _graphs, _options
+    _graphs = [unpack(p) for p in packed]
+    _options = options
+
+
+def _count_nodes(task, *args):
+    """
+    Calls <task> with <args>, and returns a tuple of its result and the number of search nodes
+    it added to gi.nodes.
+    """
+    before = dict(gi.nodes)
+    result = task(*args)
+    added = {}
+    for name in gi.nodes:
+        if gi.nodes[name] != before.get(name, 0):
+            added[name] = gi.nodes[name] - before.get(name, 0)
+    return result, added
+
+
+def _add_nodes(added):
+    for name in added:
+        gi.nodes[name] = gi.nodes.get(name, 0) + added[name]
+
+
+def _isomorphism_task(prefix):
+    """
+    Counts the isomorphisms below the node with the vertex indices <prefix> in a worker.
+    """
+    d, i = prefix
+    g, h = _graphs
+    return _count_nodes(gi.count_isomorphism, g, h, [g._V[k] for k in d], [h._V[k] for k in i],
+                        _options['stop_early'], _options['refine'], _options['selector'],
+                        not _options['stop_early'])
+
+
+def _automorphism_task(prefix):
+    """
+    Generates automorphisms below the node with the vertex indices <prefix> in a worker, and
+    returns their mappings.
+    """
+    d, i = prefix
+    graph, gCopy = _graphs
+    x = []
+    result, added = _count_nodes(gi.generate_automorphisms, graph, gCopy,
+                                 [graph._V[k] for k in d], [gCopy._V[k] for k in i], x,
+                                 _options['firstPruningRule'], _options['secondPruningRule'],
+                                 _options['membershipTesting'], _options['refine'],
+                                 _options['selector'], _options['orbitPruning'])
+    return (result, [perm.P for perm in x]), added
+
+
+def _certificate_task(packed):
+    """
+    Returns the certificate of the packed graph <packed> in a worker.
+    """
+    return canon.certificate(unpack(packed), _options['refine'], _options['selector'])
+
+
+def _subproblems(p, n, refine, select, levels, d, i, prefixes):
+    """
+    Adds the prefixes (d, i) of the nodes <levels> levels below the node of the balanced, refined
+    partition <p> (which has the prefix <d>, <i>) to <prefixes>, as lists of vertex indices of g
+    and h. Returns a tuple (leaves, count): the number of leaves (isomorphisms) above these
+    levels, and the number of nodes that were visited.
+    """
+    if len(p.start) == n:
+        return 1, 1
+    if levels == 0:
+        prefixes.append((d, i))
+        return 0, 0
+
+    c = select(p)
+    members = p.members(c)
+    for x in members:
+        if x < n:
+            break
+    leaves = 0
+    count = 1
+    for y in members:
+        if y >= n:
+            marker = p.mark()
+            if gi._individualize(p, c, x, y, refine):
+                found, visited = _subproblems(p, n, refine, select, levels - 1, d + [x], i + [y - n], prefixes)
+                leaves += found
+                count += visited
+            p.undo(marker)
+    return leaves, count
+
+
+def count_isomorphism(g, h, d=None, i=None, stop_early=False, refine=None, selector=None, exhaustive=False, jobs=None):
+    """
+    Returns the same number as gi.count_isomorphism, searching the subtrees below the first
+    (or first two) levels of the search in <jobs> worker processes (the number of CPUs if None).
+    """
+    if gi.signature(g) != gi.signature(h):
+        return 0
+    if d is None:
+        d = []
+    if i is None:
+        i = []
+    if not stop_early and not exhaustive:
+        if count_isomorphism(g, h, d, i, True, refine, selector, False, jobs) == 0:
+            return 0
+        return automorphism_order(g, d, refine, selector, jobs)
+
+    strategy = gi.get_strategy(refine, g, h)
+    p, n, index = gi._initial_partition(g, h, d, i, strategy)
+    if p is None:
+        return 0
+    select, name = gi.get_selector(selector)
+    if jobs is None:
+        jobs = multiprocessing.cpu_count()
+
+    d = [index[v] for v in d]
+    i = [index[v] - n for v in i]
+    prefixes = []
+    leaves, count = _subproblems(p, n, strategy, select, 1, d, i, prefixes)
+    if len(prefixes) < jobs:
+        prefixes = []
+        leaves, count = _subproblems(p, n, strategy, select, 2, d, i, prefixes)
+    gi.nodes[name] = gi.nodes.get(name, 0) + count
+    if stop_early and leaves > 0:
+        return 1
+    if len(prefixes) == 0:
+        return leaves
+
+    options = {'stop_early': stop_early, 'refine': refine, 'selector': selector}
+    num = leaves
+    with multiprocessing.Pool(min(jobs, len(prefixes)), _init_worker, ([pack(g), pack(h)], options)) as pool:
+        for result, added in pool.imap_unordered(_isomorphism_task, prefixes):
+            _add_nodes(added)
+            num += result
+            if stop_early and num > 0:
+                return 1  # leaving the with statement stops the other workers
+    return num
+
+
+def automorphism_order(g, d=None, refine=None, selector=None, jobs=None):
+    """
+    Returns the same number as gi.automorphism_order, generating the automorphisms in <jobs>
+    worker processes (the number of CPUs if None). Forests, graphs with pendant trees and graphs
+    with a non-trivial modular decomposition are solved by gi.automorphism_order as well, so
+    only the searches that are left are handed to the workers.
+    """
+    if jobs is None:
+        jobs = multiprocessing.cpu_count()
+    return gi.automorphism_order(g, d, refine, selector, jobs)
+
+
+def generate_automorphisms(graph, gCopy, verticesD, verticesI, x, firstPruningRule=True, secondPruningRule=True, membershipTesting=False, refine=None, selector=None, orbitPruning=True, jobs=None):
+    """
+    Adds generators for the automorphisms of <graph> that map the vertices in verticesD onto
+    those in verticesI to x, like gi.generate_automorphisms, handing the vertices that the root
+    maps its individualized vertex onto to <jobs> worker processes (the number of CPUs if None).
+    The search is done by gi.generate_automorphisms itself if the individualized vertices are
+    not mapped onto vertices with the same labels (then the first pruning rule stops it at the
+    first automorphism), or if the root is a leaf.
+    """
+    strategy = gi.get_strategy(refine, graph, gCopy)
+    p, n, index = gi._initial_partition(graph, gCopy, verticesD, verticesI, strategy)
+    if p is None:
+        return False
+    trivial = True
+    for k in range(len(verticesD)):
+        if verticesD[k]._label != verticesI[k]._label:
+            trivial = False
+    if len(p.start) == n or not trivial:
+        return gi.generate_automorphisms(graph, gCopy, verticesD, verticesI, x, firstPruningRule, secondPruningRule,
+                                         membershipTesting, refine, selector, orbitPruning)
+    if jobs is None:
+        jobs = multiprocessing.cpu_count()
+
+    select, name = gi.get_selector(selector)
+    vertices = graph._V + gCopy._V
+    newEls = [0]
+    labels = [0]
+    checklists = [None]
+    gi._automorphism_target(p, vertices, n, select(p), 0, newEls, labels, checklists)
+    gi.nodes[name] = gi.nodes.get(name, 0) + 1
+    label = labels[0]
+    d = [index[v] for v in verticesD] + [newEls[0]]
+    i = [index[v] - n for v in verticesI]
+
+    # the orbit pruning of the root, with the arrays of gi._update_orbits for a single level
+    fixed = [v._label for v in verticesI]
+    stabilizers = [[]]
+    checked = [0]
+    tried = [[]]
+    covered = [set()]
+
+    options = {'firstPruningRule': firstPruningRule, 'secondPruningRule': secondPruningRule,
+               'membershipTesting': membershipTesting, 'refine': refine, 'selector': selector,
+               'orbitPruning': orbitPruning}
+    finished = queue.Queue()
+    result = False
+    with multiprocessing.Pool(jobs, _init_worker, ([pack(graph), pack(gCopy)], options)) as pool:
+        running = 0
+        k = 0
+        checklist = checklists[0]
+        while True:
+            # hand out vertices that are not in the orbit of one that was handed out already
+            while running < jobs and k < len(checklist):
+                w = vertices[checklist[k]]._label
+                k += 1
+                if secondPruningRule and label != w and len(x) > 0 and w in Orbit(x, label):
+                    continue
+                if orbitPruning and w in covered[0]:
+                    continue
+                if orbitPruning:
+                    tried[0].append(w)
+                    if len(stabilizers[0]) == 0:
+                        covered[0].add(w)
+                    else:
+                        covered[0].update(Orbit(stabilizers[0], w))
+                pool.apply_async(_automorphism_task, ((d, i + [checklist[k - 1] - n]),),
+                                 callback=finished.put, error_callback=finished.put)
+                running += 1
+            if running == 0:
+                return result
+
+            done = finished.get()
+            running -= 1
+            if isinstance(done, BaseException):
+                raise done
+            (found, mappings), added = done
+            _add_nodes(added)
+            result = result or found
+            for mapping in mappings:
+                perm = permutation(len(mapping), mapping=mapping)
+                if not membershipTesting or not permgrputil.is_member(perm, x):
+                    x.append(perm)
+            if orbitPruning:
+                gi._update_orbits(x, fixed, len(fixed), 0, stabilizers, checked, tried, covered)
+
+
+def count_automorphisms(graph, graphCopy, refine=None, selector=None, jobs=None):
+    """
+    Returns the number of automorphisms of <graph>, like gi.count_automorphisms (which solves
+    forests, graphs with pendant trees and graphs with a non-trivial modular decomposition
+    without a search), generating them in <jobs> worker processes (the number of CPUs if None).
+    """
+    if jobs is None:
+        jobs = multiprocessing.cpu_count()
+    return gi.count_automorphisms(graph, graphCopy, refine, selector, jobs)
+
+
+def certificates(graphs, refine=None, selector=None, jobs=None):
+    """
+    Returns the list of the certificates (see canon.py) of <graphs>, in the same order, computed
+    in <jobs> worker processes (the number of CPUs if None). Every graph is sent to the worker
+    that computes its certificate.
+    """
+    if jobs is None:
+        jobs = multiprocessing.cpu_count()
+    if len(graphs) == 0:
+        return []
+    options = {'refine': refine, 'selector': selector}
+    with multiprocessing.Pool(min(jobs, len(graphs)), _init_worker, ([], options)) as pool:
+        return pool.map(_certificate_task, [pack(g) for g in graphs], chunksize=1)
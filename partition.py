@@ -0,0 +1,425 @@
+"""
+This module contains a class <partition> for refining an ordered partition of the vertices
+of one or two graphs (which are colored together), used by the search functions in gi.py.
+
+The vertices are numbered (the vertices of the first graph first, in the order of its vertex
+list), and a partition stores:
+ <elements>: all vertex numbers, such that every cell is a contiguous part of this list,
+ <position>: the position of every vertex in <elements>,
+ <cellof>: the cell (an integer) of every vertex,
+ <start>, <end>: for every cell the part <elements>[start[c]:end[c]] that it occupies.
+A cell that is split keeps its number for its largest part, and the other parts get new
+numbers, so only the vertices of the smaller parts have to be moved and relabeled.
+
+refine() uses Hopcroft's strategy of not processing the largest part of a split cell, which
+gives an O((V+E) log V) bound on the total refinement work.
+
+When two graphs g and h with <half> vertices each are colored together (g numbered first), the
+refinement of g and of h alone would split the same cells in the same order into parts of the
+same sizes and with the same neighbour counts, as long as g and h can still be isomorphic under
+the current coloring. Every split therefore has to divide the vertices of both graphs in the same
+way: as soon as a part contains more vertices of one graph than of the other, the two refinement
+traces diverge, and the refinement stops without doing the rest of its work.
+"""
+
+
+def cache_key(graph, colors=False):
+    """
+    Returns the key under which a result for <graph> is cached on it: the numbers of vertices and
+    edges, and if <colors> is True the colornums of the vertices, so that a result is recomputed
+    after vertices or edges are added (or the vertices are recolored).
+    """
+    key = (len(graph._V), len(graph._E) if hasattr(graph, '_E') else len(graph._tails))
+    if colors:
+        key += (tuple(v.colornum for v in graph._V),)
+    return key
+
+
+def cached(graph, name, compute, colors=False):
+    """
+    Returns compute(), which is cached on <graph> in the attribute <name> under the key of
+    cache_key(graph, colors), so it is computed again when that key changes.
+    """
+    key = cache_key(graph, colors)
+    entry = getattr(graph, name, None)
+    if entry is None or entry[0] != key:
+        entry = (key, compute())
+        setattr(graph, name, entry)
+    return entry[1]
+
+
+def is_simple(nbs):
+    """
+    Returns True iff the graph with adjacency lists <nbs> has no loops or multiple edges.
+    """
+    return all(v not in nbs[v] and len(set(nbs[v])) == len(nbs[v]) for v in range(len(nbs)))
+
+
+def components_of(nbs, vertices, inside, k, complement):
+    """
+    Returns the components of the subgraph on <vertices> (the vertices v with inside[v] == k),
+    or of its complement if <complement> is True. For the complement, the vertices that are not
+    reached yet are kept in a set, and every vertex that is reached removes those that are not
+    its neighbours: a vertex stays in the set only for the neighbours of the vertices that
+    are reached, so this takes linear time.
+    """
+    components = []
+    if not complement:
+        seen = set()
+        for s in vertices:
+            if s in seen:
+                continue
+            seen.add(s)
+            component = [s]
+            stack = [s]
+            while len(stack) > 0:
+                v = stack.pop()
+                for u in nbs[v]:
+                    if inside[u] == k and u not in seen:
+                        seen.add(u)
+                        component.append(u)
+                        stack.append(u)
+            components.append(component)
+        return components
+
+    unreached = set(vertices)
+    while len(unreached) > 0:
+        s = unreached.pop()
+        component = [s]
+        stack = [s]
+        while len(stack) > 0:
+            v = stack.pop()
+            adjacent = set(u for u in nbs[v] if inside[u] == k)
+            reached = [u for u in unreached if u not in adjacent]
+            if len(reached) > 0:
+                # a new set, as iterating over a set takes time for the removed elements as well
+                unreached = set(u for u in unreached if u in adjacent)
+            component += reached
+            stack += reached
+        components.append(component)
+    return components
+
+
+def adjacency(graph):
+    """
+    Returns a tuple (index, nbs) for <graph>: <index> maps every vertex to its index in the
+    vertex list of the graph, and nbs[i] is the list of indices of the neighbours of vertex i.
+    For a csrgraph, nbs[i] is the part of the CSR neighbour array of vertex i, an integer array
+    that takes 4 bytes per neighbour instead of the 8 of a list.
+    The result is rebuilt after vertices or edges are added, see cached.
+    """
+    return cached(graph, '_adjacency', lambda: _adjacency(graph))
+
+
+def _adjacency(graph):
+    index = {}
+    for v in graph._V:
+        index[v] = len(index)
+    if hasattr(graph, 'offsets'):  # csrgraph: vertex i has id i
+        offsets = graph.offsets()
+        ids = graph._nbs
+        nbs = [ids[offsets[i]:offsets[i + 1]] for i in range(len(graph._V))]
+    else:
+        nbs = [[index[u] for u in v.get_cached_nbs()] for v in graph._V]
+    return index, nbs
+
+
+# adjacency of the last pair of graphs that was used, see pair_adjacency
+_last_pair = None
+
+
+def pair_adjacency(g, h):
+    """
+    Returns a tuple (vertices, index, nbs) for the disjoint union of <g> and <h>
+    (<h> may be None): the list of all vertices (those of <g> first), a dictionary from
+    vertices to their number, and for every vertex the list of numbers of its neighbours.
+    The search functions color the same pair of graphs many times, so the last result is kept.
+    """
+    global _last_pair
+
+    graphs = [g] if h is None else [g, h]
+    parts = [adjacency(G) for G in graphs]
+    if _last_pair is not None and len(_last_pair[0]) == len(graphs) and \
+            all(_last_pair[0][k] is graphs[k] and _last_pair[1][k] is parts[k][1] for k in range(len(graphs))):
+        return _last_pair[2]
+
+    vertices = []
+    index = {}
+    nbs = []
+    for G, (G_index, G_nbs) in zip(graphs, parts):
+        base = len(vertices)
+        for v in G._V:
+            index[v] = len(vertices)
+            vertices.append(v)
+        if base == 0:
+            nbs += G_nbs
+        else:
+            nbs += [[u + base for u in l] for l in G_nbs]
+
+    _last_pair = (graphs, [p[1] for p in parts], (vertices, index, nbs))
+    return _last_pair[2]
+
+
+class partition():
+    def __init__(self, nbs, cells, half=None):
+        """
+        Creates an ordered partition of the vertices 0...n-1, where nbs[v] is the list of
+        neighbours of vertex v.
+        <cells> is a dictionary from cell numbers to lists of vertex numbers; every vertex must
+        be in exactly one cell. New cells are numbered after the largest number in <cells>.
+        Optional argument <half>: the number of vertices of the first of two graphs that are
+        colored together, if the refinement has to stop when their traces diverge; every cell
+        in <cells> must then contain as many vertices of both graphs.
+        """
+        n = len(nbs)
+        self.nbs = nbs
+        self.half = half
+        self.elements = []
+        self.position = [0] * n
+        self.cellof = [0] * n
+        size = max(cells) + 1 if len(cells) > 0 else 0
+        self.start = [0] * size
+        self.end = [0] * size
+        self.count = [0] * n  # neighbour counters, only nonzero during refine
+        self.trail = []  # split operations, see mark and undo
+
+        elements = self.elements
+        for c in cells:
+            self.start[c] = len(elements)
+            for v in cells[c]:
+                self.position[v] = len(elements)
+                self.cellof[v] = c
+                elements.append(v)
+            self.end[c] = len(elements)
+
+    def size(self, c):
+        """
+        Returns the number of vertices in cell <c>.
+        """
+        return self.end[c] - self.start[c]
+
+    def members(self, c):
+        """
+        Returns the list of vertices in cell <c>.
+        """
+        return self.elements[self.start[c]:self.end[c]]
+
+    def is_balanced(self, c):
+        """
+        Returns True iff cell <c> contains as many vertices of both graphs (see <half>).
+        """
+        half = self.half
+        num0 = 0
+        elements = self.elements
+        for p in range(self.start[c], self.end[c]):
+            if elements[p] < half:
+                num0 += 1
+        return 2 * num0 == self.end[c] - self.start[c]
+
+    def mark(self):
+        """
+        Returns a marker for the current state of the partition, see undo.
+        """
+        return len(self.trail)
+
+    def undo(self, marker):
+        """
+        Undoes all splits since mark() returned <marker>, by merging the split off cells back
+        into the cells they were split from. (The order of the vertices within the restored
+        cells may differ.)
+        """
+        trail = self.trail
+        cellof = self.cellof
+        elements = self.elements
+        while len(trail) > marker:
+            c, start, end, new = trail.pop()
+            for d in reversed(new):
+                for p in range(self.start[d], self.end[d]):
+                    cellof[elements[p]] = c
+                self.start.pop()
+                self.end.pop()
+            self.start[c] = start
+            self.end[c] = end
+
+    def split(self, c, vertices):
+        """
+        Splits the vertices <vertices> off cell <c> into a new cell, which is returned.
+        All of <vertices> must be in cell <c>, and they may not be all of its vertices.
+        """
+        self._arrange(c, vertices)
+        end = self.end[c]
+        return self._divide(c, [(self.start[c], end - len(vertices)), (end - len(vertices), end)])
+
+    def split_by(self, c, key):
+        """
+        Splits cell <c> into parts of vertices <v> with the same value of key(v), ordered by
+        these values. Returns the list of new cell numbers (empty if all values are equal).
+        """
+        decorated = sorted([(key(v), v) for v in self.members(c)])
+        if decorated[0][0] == decorated[-1][0]:
+            return []
+
+        elements = self.elements
+        position = self.position
+        p = self.start[c]
+        parts = []
+        for k in range(len(decorated)):
+            if k > 0 and decorated[k][0] != decorated[k - 1][0]:
+                parts.append((p, self.start[c] + k))
+                p = self.start[c] + k
+            v = decorated[k][1]
+            elements[self.start[c] + k] = v
+            position[v] = self.start[c] + k
+        parts.append((p, self.end[c]))
+        return self._divide(c, parts)
+
+    def _arrange(self, c, vertices):
+        """
+        Moves the <vertices> of cell <c> to the end of the cell, in the given order.
+        """
+        elements = self.elements
+        position = self.position
+        back = self.end[c]
+        for v in vertices:
+            back -= 1
+            p = position[v]
+            w = elements[back]
+            elements[back] = v
+            position[v] = back
+            elements[p] = w
+            position[w] = p
+        back = self.end[c] - len(vertices)
+        for k in range(len(vertices)):
+            v = vertices[k]
+            elements[back + k] = v
+            position[v] = back + k
+
+    def _divide(self, c, parts):
+        """
+        Splits cell <c> into the consecutive ranges <parts> of the elements list (which must
+        cover the cell). The largest part (the first one in case of a tie) keeps number <c>,
+        the other parts get new numbers. Returns the list of new cell numbers.
+        """
+        largest = 0
+        for k in range(1, len(parts)):
+            if parts[k][1] - parts[k][0] > parts[largest][1] - parts[largest][0]:
+                largest = k
+
+        self.trail.append((c, self.start[c], self.end[c], []))
+        new = self.trail[-1][3]
+        cellof = self.cellof
+        elements = self.elements
+        for k in range(len(parts)):
+            start, end = parts[k]
+            if k == largest:
+                self.start[c] = start
+                self.end[c] = end
+            else:
+                d = len(self.start)
+                self.start.append(start)
+                self.end.append(end)
+                for p in range(start, end):
+                    cellof[elements[p]] = d
+                new.append(d)
+        return new
+
+    def _balanced_by_count(self, vertices):
+        """
+        Returns True iff for every neighbour count, the <vertices> (sorted by count) with that
+        count contain as many vertices of both graphs. Then the untouched part of their cell is
+        balanced as well.
+        """
+        count = self.count
+        half = self.half
+        difference = 0
+        for k in range(len(vertices)):
+            if k > 0 and count[vertices[k]] != count[vertices[k - 1]]:
+                if difference != 0:
+                    return False
+            difference += 1 if vertices[k] < half else -1
+        return difference == 0
+
+    def refine(self, queue, even=True):
+        """
+        Refines the partition until it is equitable: all vertices in a cell have the same number
+        of neighbours in every cell. <queue> is the list of cells that have to be used to split
+        other cells; this must include all cells except possibly one cell of the coarsest
+        partition that the current partition was obtained from by splitting.
+        If <even> is True, the refinement stops and returns False as soon as a cell with an odd
+        number of vertices is used to split other cells (this can only happen when two graphs
+        with an equal number of vertices are colored together and they are not isomorphic).
+        If <half> is set, it also stops and returns False as soon as the traces of both graphs
+        diverge, i.e. a cell would be split unevenly, before that cell is split.
+        Otherwise it returns True.
+        """
+        nbs = self.nbs
+        half = self.half
+        count = self.count
+        cellof = self.cellof
+        elements = self.elements
+        start = self.start
+        end = self.end
+
+        pending = []
+        inqueue = set()
+        for c in queue:
+            if c not in inqueue:
+                inqueue.add(c)
+                pending.append(c)
+
+        while len(pending) > 0:
+            c = pending.pop()
+            inqueue.discard(c)
+            if even and (end[c] - start[c]) % 2 == 1:
+                return False
+
+            # count for every vertex its neighbours in c
+            touched = []
+            for p in range(start[c], end[c]):
+                for u in nbs[elements[p]]:
+                    if count[u] == 0:
+                        touched.append(u)
+                    count[u] += 1
+
+            cells = {}
+            for u in touched:
+                d = cellof[u]
+                if d in cells:
+                    cells[d].append(u)
+                else:
+                    cells[d] = [u]
+
+            for d in sorted(cells):
+                vertices = cells[d]
+                vertices.sort(key=count.__getitem__)
+                size = end[d] - start[d]
+                if len(vertices) == size and count[vertices[0]] == count[vertices[-1]]:
+                    continue
+
+                if half is not None and not self._balanced_by_count(vertices):
+                    for u in touched:
+                        count[u] = 0
+                    return False
+
+                # untouched vertices first, followed by the touched ones ordered by count
+                self._arrange(d, vertices)
+                parts = []
+                p = end[d] - len(vertices)
+                if p > start[d]:
+                    parts.append((start[d], p))
+                for k in range(1, len(vertices)):
+                    if count[vertices[k]] != count[vertices[k - 1]]:
+                        parts.append((p, end[d] - len(vertices) + k))
+                        p = end[d] - len(vertices) + k
+                parts.append((p, end[d]))
+
+                # Hopcroft: if d was not queued, all parts except the largest (which keeps
+                # number d) have to be queued; if it was queued, d is still queued
+                for e in self._divide(d, parts):
+                    inqueue.add(e)
+                    pending.append(e)
+
+            for u in touched:
+                count[u] = 0
+
+        return True
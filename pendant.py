@@ -0,0 +1,159 @@
+"""
+Isomorphism and automorphisms of connected graphs by pruning their pendant trees.
+
+Removing the leaves of a connected graph that is not a tree repeatedly leaves its core (the
+2-core: the largest subgraph in which every vertex has at least two neighbours), with a rooted
+tree hanging from every core vertex: the vertices that were removed through it. Isomorphisms map
+the core onto the core and every pendant tree onto the pendant tree of the image of its root,
+so the graph is encoded by its core, with every core vertex colored by the code of its pendant
+tree (see trees.py: the code of the pair of the colornum of a vertex and the sorted codes of its
+children). The codes are given out by a dictionary: count_isomorphism shares one between the
+two graphs that it compares, so that their cores can be compared, and automorphism_order uses
+the core that is cached on the graph, with a dictionary of its own, so that the automorphism
+group of the core is computed only once.
+
+Two such graphs are isomorphic iff their colored cores are, and the number of isomorphisms is
+that of the colored cores times the number of automorphisms of the pendant trees that fix their
+roots: the product of the factorials of the numbers of identical children of every vertex. So
+the search of gi.py only refines and branches on the vertices of the core.
+
+gi.count_isomorphism (unless it is exhaustive or vertices are individualized),
+gi.automorphism_order and gi.count_automorphisms use count_isomorphism and automorphism_order,
+which solve the cores with gi.count_isomorphism and gi.automorphism_order. Graphs that are not
+connected, forests, and graphs with loops or multiple edges are not pruned.
+"""
+
+import gi
+from basicgraphs import graph
+from partition import adjacency, cached, is_simple
+from trees import factorials
+
+
+def peel(g):
+    """
+    Returns a tuple (removed, parent, core) for <g>: the list of vertex numbers (see
+    partition.adjacency) that are removed as leaves, in the order of their removal, the vertex
+    through which every removed vertex was attached (the only neighbour left when it was
+    removed), and the list of the vertices of the core. Returns None if <g> has no leaves, is not
+    connected, is a forest, or has loops or multiple edges.
+    """
+    return cached(g, '_peel', lambda: _peel(adjacency(g)[1]))
+
+
+def _peel(nbs):
+    """
+    Returns the result of peel for the graph with adjacency lists <nbs>.
+    """
+    if not is_simple(nbs):
+        return None
+    n = len(nbs)
+    degree = [len(nbs[v]) for v in range(n)]
+    order = [v for v in range(n) if degree[v] == 1]
+    if len(order) == 0:
+        return None
+
+    seen = [False] * n
+    seen[0] = True
+    reached = [0]
+    for v in reached:
+        for u in nbs[v]:
+            if not seen[u]:
+                seen[u] = True
+                reached.append(u)
+    if len(reached) < n:
+        return None
+
+    removed = [False] * n
+    parent = [-1] * n
+    for v in order:
+        removed[v] = True
+        for u in nbs[v]:
+            if not removed[u]:
+                parent[v] = u
+                degree[u] -= 1
+                if degree[u] == 1:
+                    order.append(u)
+    if len(order) == n:
+        return None
+    return order, parent, [v for v in range(n) if not removed[v]]
+
+
+def count_isomorphism(g, h, stop_early=False, refine=None, selector=None, jobs=None, budget=None):
+    """
+    Returns the number of isomorphisms between graphs g and h (with <stop_early>: 1 if there is
+    one, 0 if not) computed from their colored cores, or None if neither of them is pruned (or if
+    the <budget> of the search of the cores runs out first).
+    The optional arguments are used for the cores, see gi.py.
+    """
+    pg = peel(g)
+    ph = peel(h)
+    if pg is None and ph is None:
+        return None
+    if pg is None or ph is None or len(g._V) != len(h._V) or len(pg[2]) != len(ph[2]):
+        return 0
+
+    codes = {}
+    core_g, factor = core(g, codes)
+    core_h = core(h, codes)[0]
+    num = gi.count_isomorphism(core_g, core_h, stop_early=stop_early, refine=refine, selector=selector, jobs=jobs, budget=budget)
+    return num if stop_early or num is None else num * factor
+
+
+def automorphism_order(g, refine=None, selector=None, jobs=None, budget=None):
+    """
+    Returns the number of automorphisms of <g> computed from its colored core (a lower bound if
+    the <budget> runs out), or None if <g> is not pruned.
+    """
+    if peel(g) is None:
+        return None
+    c, factor = core(g)
+    return gi.automorphism_order(c, refine=refine, selector=selector, jobs=jobs, budget=budget) * factor
+
+
+def core(g, codes=None):
+    """
+    Returns a tuple (core, factor) for <g>, which is pruned (see peel): the core, with vertex k
+    (labelled k) for the k-th core vertex, colored by the code of its pendant tree, and the number
+    of automorphisms of the pendant trees that fix their roots.
+    Optional argument <codes>: the dictionary of codes (see _core) shared with the core of another
+    graph that has to be compared with it. Without it, the core is colored with a dictionary of
+    its own and cached on the graph, with the colors of <g>, see partition.cached.
+    """
+    if codes is not None:
+        return _core(g, peel(g), codes)
+    return cached(g, '_core', lambda: _core(g, peel(g), {}), colors=True)
+
+
+def _core(g, peeled, codes):
+    """
+    Returns the result of core for <g> with the result <peeled> of peel, with the dictionary
+    <codes> from pairs (colornum, sorted codes of the children) to codes. The removed vertices
+    are coded in the order of their removal, after their children.
+    """
+    removed, parent, vertices = peeled
+    index, nbs = adjacency(g)
+    child_codes = [[] for v in range(len(nbs))]
+    colors = {}
+    factor = 1
+    for v in removed + vertices:
+        key = (g._V[v].colornum, tuple(sorted(child_codes[v])))
+        if key not in codes:
+            codes[key] = len(codes)
+        factor *= factorials(child_codes[v])
+        if parent[v] == -1:
+            colors[v] = codes[key]
+        else:
+            child_codes[parent[v]].append(codes[key])
+
+    local = {}
+    for v in vertices:
+        local[v] = len(local)
+    pairs = []
+    for v in vertices:
+        for u in nbs[v]:
+            if u > v and u in local:
+                pairs.append((local[v], local[u]))
+    core = graph.from_edge_list(len(vertices), pairs, simple=True)
+    for v in vertices:
+        core._V[local[v]].colornum = colors[v]
+    return core, factor
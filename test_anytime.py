@@ -0,0 +1,55 @@
+import time
+
+import gi
+import graphIO
+from anytime import budget
+from graphmaker import disjoint_union
+
+
+def two_copies(path):
+    g = graphIO.loadgraph(path, readlist=True)[0][0]
+    return disjoint_union(g, g.clone())
+
+
+def resume(search, b, path, nodes=None, seconds=None):
+    """
+    Calls search(b) until the budget <b> does not run out, saving it to and loading it from the
+    file <path> in between, and returns the last result and the number of calls.
+    """
+    result = search(b)
+    calls = 1
+    while b.exhausted:
+        b.save(path)
+        b = budget.load(path, nodes, seconds)
+        result = search(b)
+        calls += 1
+    return result, calls
+
+
+def test_time_limit(tmp_path):
+    G = two_copies('test_2/products216.grl')
+    order = gi.count_automorphisms(G.clone(), G.clone())
+
+    b = budget(seconds=0.1)
+    start = time.time()
+    bound = gi.count_automorphisms(G, G.clone(), budget=b)
+    assert time.time() - start < 0.5
+    assert b.exhausted and order % bound == 0
+
+    result, calls = resume(lambda b: gi.count_automorphisms(G, G.clone(), budget=b), b, str(tmp_path / 'b.json'), seconds=0.1)
+    assert result == order and calls > 1
+
+
+def test_node_limit(tmp_path, rnd, random_graph, relabel, brute_count):
+    path = str(tmp_path / 'b.json')
+    for k in range(20):
+        g = disjoint_union(random_graph(rnd, 6, 0.5, 2), random_graph(rnd, 6, 0.5, 2))
+        h = relabel(g, rnd)
+        num = brute_count(g, h) if k < 4 else None
+        order = gi.count_automorphisms(g.clone(), g.clone())
+        if num is not None:
+            assert order == brute_count(g, g)
+        assert resume(lambda b: gi.count_automorphisms(g, g.clone(), budget=b), budget(nodes=2), path, nodes=2)[0] == order
+        assert resume(lambda b: gi.automorphism_order(g, budget=b), budget(nodes=2), path, nodes=2)[0] == order
+        count = resume(lambda b: gi.count_isomorphism(g, h, budget=b), budget(nodes=2), path, nodes=2)[0]
+        assert count == (num if num is not None else gi.count_isomorphism(g.clone(), h.clone()))
@@ -0,0 +1,38 @@
+import canon
+import gi
+
+
+def test_certificates(rnd, random_graph, relabel, brute_count):
+    for colors in (1, 2):
+        for k in range(60):
+            g = random_graph(rnd, rnd.randrange(1, 8), rnd.random(), colors)
+            h = relabel(g, rnd) if k % 2 == 0 else random_graph(rnd, len(g._V), rnd.random(), colors)
+            for selector in gi.SELECTORS:
+                same = canon.certificate(g, selector=selector) == canon.certificate(h, selector=selector)
+                assert same == (brute_count(g, h) > 0)
+
+
+def test_canonical_labelling(rnd, random_graph, relabel):
+    for k in range(30):
+        g = random_graph(rnd, 7, 0.4, 2)
+        h = relabel(g, rnd)
+        forms = []
+        for G in (g, h):
+            labelling, certificate = canon.canonical_form(G)
+            index = {}
+            for v in G._V:
+                index[v] = len(index)
+            edges = sorted(tuple(sorted((labelling[index[e.tail()]], labelling[index[e.head()]]))) for e in G._E)
+            colors = sorted((labelling[i], G._V[i].colornum) for i in range(len(G._V)))
+            forms.append((edges, colors))
+        assert forms[0] == forms[1]
+
+
+def test_recolored_graph(rnd, random_graph):
+    g = random_graph(rnd, 6, 0.5)
+    h = g.clone()
+    before = canon.certificate(g)
+    g._V[0].colornum = 1
+    h._V[0].colornum = 1
+    assert canon.certificate(g) != before
+    assert canon.certificate(g) == canon.certificate(h.clone())
@@ -0,0 +1,61 @@
+import pytest
+
+import gi
+import vrecolor
+from basicgraphs import graph
+
+
+def cube():
+    pairs = [(a, b) for a in range(8) for b in range(a + 1, 8) if bin(a ^ b).count('1') == 1]
+    return graph.from_edge_list(8, pairs, simple=True)
+
+
+def test_automorphism_order(rnd, random_graph, brute_count):
+    for colors in (1, 2):
+        for k in range(60):
+            g = random_graph(rnd, rnd.randrange(1, 8), rnd.random(), colors)
+            assert gi.automorphism_order(g) == brute_count(g, g)
+
+
+def test_count_isomorphism(rnd, random_graph, relabel, brute_count):
+    for colors in (1, 2):
+        for k in range(60):
+            g = random_graph(rnd, rnd.randrange(1, 8), rnd.random(), colors)
+            h = relabel(g, rnd) if k % 2 == 0 else random_graph(rnd, len(g._V), rnd.random(), colors)
+            num = brute_count(g, h)
+            assert gi.count_isomorphism(g, h) == num
+            assert gi.count_isomorphism(g, h, stop_early=True) == min(num, 1)
+
+
+def test_strategies_and_selectors(rnd, random_graph, relabel, brute_count):
+    for k in range(20):
+        g = random_graph(rnd, 7, 0.5, 2)
+        h = relabel(g, rnd)
+        num = brute_count(g, h)
+        for refine in ('classic', 'hopcroft') + (('vector',) if vrecolor.numpy is not None else ()):
+            for selector in gi.SELECTORS:
+                assert gi.count_isomorphism(g, h, refine=refine, selector=selector, exhaustive=True) == num
+
+
+def test_recolored_graph():
+    g = cube()
+    h = cube()
+    assert gi.automorphism_order(g) == 48
+    g._V[0].colornum = 1
+    h._V[0].colornum = 1
+    assert gi.automorphism_order(g) == 6
+    assert gi.count_isomorphism(g, h) == 6
+
+
+def circulant(n, jumps):
+    return graph.from_edge_list(n, [(k, (k + j) % n) for k in range(n) for j in jumps], simple=True)
+
+
+def test_2wl(rnd, relabel, brute_count):
+    # regular graphs, on which color refinement leaves a single cell for 2-WL
+    pytest.importorskip('numpy')
+    for jumps, other in (((1,), (2,)), ((1, 2), (1, 3)), ((1,), (3,)), ((2, 3), (1, 3))):
+        g = circulant(8, jumps)
+        for h in (relabel(g, rnd), circulant(8, other)):
+            num = brute_count(g, h)
+            assert gi.count_isomorphism(g, h, refine='hopcroft+2wl', exhaustive=True) == num
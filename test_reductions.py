@@ -0,0 +1,97 @@
+import gi
+import permgrputil
+import trees
+import modules
+import pendant
+import twins
+import components
+from basicgraphs import graph
+
+
+def random_tree(rnd, n, colors=1):
+    pairs = [(rnd.randrange(k), k) for k in range(1, n)]
+    g = graph.from_edge_list(n, pairs, simple=True)
+    for v in g._V:
+        v.colornum = rnd.randrange(colors)
+    return g
+
+
+def random_cograph(rnd, n):
+    """
+    Returns a random cograph with <n> vertices, built by disjoint unions and joins.
+    """
+    parts = [[k] for k in range(n)]
+    pairs = []
+    while len(parts) > 1:
+        a = parts.pop(rnd.randrange(len(parts)))
+        b = parts.pop(rnd.randrange(len(parts)))
+        if rnd.random() < 0.5:
+            pairs += [(u, v) for u in a for v in b]
+        parts.append(a + b)
+    return graph.from_edge_list(n, pairs, simple=True)
+
+
+def random_pendant_graph(rnd, n):
+    """
+    Returns a connected graph with <n> vertices: a cycle with trees hanging from it.
+    """
+    size = rnd.randrange(3, n - 1)
+    pairs = [(k, (k + 1) % size) for k in range(size)]
+    pairs += [(rnd.randrange(k), k) for k in range(size, n)]
+    return graph.from_edge_list(n, pairs, simple=True)
+
+
+def check(g, relabel, rnd, brute_count):
+    num = brute_count(g, g)
+    assert gi.automorphism_order(g) == num
+    assert gi.count_automorphisms(g, g.clone()) == num
+    h = relabel(g, rnd)
+    assert gi.count_isomorphism(g, h) == num
+    x = []
+    gi.generate_automorphisms(g, g.clone(), [], [], x)
+    assert permgrputil.order(x) == num
+
+
+def test_trees(rnd, relabel, brute_count):
+    for k in range(40):
+        g = random_tree(rnd, rnd.randrange(1, 8), 1 + k % 2)
+        assert trees.forest(g) is not None
+        check(g, relabel, rnd, brute_count)
+
+
+def test_cographs(rnd, relabel, brute_count):
+    for k in range(40):
+        g = random_cograph(rnd, rnd.randrange(2, 8))
+        assert not modules.is_trivial(modules.decomposition(g))
+        check(g, relabel, rnd, brute_count)
+
+
+def test_pendant_graphs(rnd, relabel, brute_count):
+    for k in range(40):
+        g = random_pendant_graph(rnd, rnd.randrange(5, 8))
+        assert pendant.peel(g) is not None
+        check(g, relabel, rnd, brute_count)
+
+
+def test_random_graphs(rnd, random_graph, relabel, brute_count):
+    for k in range(60):
+        g = random_graph(rnd, rnd.randrange(1, 8), rnd.random(), 1 + k % 2)
+        check(g, relabel, rnd, brute_count)
+
+
+def test_recolored_reductions(rnd, brute_count):
+    # a triangle with a path of two vertices: pendant trees, and a pair of twins
+    g = graph.from_edge_list(5, [(0, 1), (1, 2), (2, 0), (2, 3), (3, 4)], simple=True)
+    assert twins.reduce(g) is not None and pendant.peel(g) is not None
+    assert gi.automorphism_order(g) == 2
+    g._V[0].colornum = 1
+    assert gi.automorphism_order(g) == brute_count(g, g) == 1
+    assert twins.reduce(g) is None
+    assert pendant.core(g)[0]._V[0].colornum != pendant.core(g)[0]._V[1].colornum
+
+    # two triangles: components, and twins within them
+    g = graph.from_edge_list(6, [(0, 1), (1, 2), (2, 0), (3, 4), (4, 5), (5, 3)], simple=True)
+    assert components.split(g) is not None
+    assert gi.count_automorphisms(g, g.clone()) == 72
+    g._V[0].colornum = 1
+    assert gi.count_automorphisms(g, g.clone()) == brute_count(g, g) == 12
@@ -0,0 +1,239 @@
+"""
+Isomorphism and automorphisms of trees and forests, with canonical encodings (AHU).
+
+Every tree has a center of one vertex or two adjacent vertices (the vertices that remain when
+leaves are removed repeatedly), which isomorphisms map onto each other. A tree is rooted at its
+center vertex, or split into two halves rooted at the two center vertices, and the code of every
+rooted subtree is the code of the pair of the colornum of its root and the sorted codes of the
+subtrees of its children (codes are numbers, given out by a dictionary from these pairs that is
+shared by the graphs that are compared). Two rooted subtrees are isomorphic iff they have the same
+code, so two forests are isomorphic iff they have the same sorted list of codes of their trees.
+
+The automorphisms of a forest permute the children with the same code of every vertex, the two
+halves of a tree with two center vertices if they have the same code, and the trees with the same
+code, and map their subtrees onto each other; the other vertices are mapped as a consequence.
+So the order of the automorphism group is the product of the factorials of the numbers of
+identical children of every vertex (and identical halves and trees). As generators, for every
+such group of k identical subtrees, a permutation that swaps the first two of them and (if k > 2)
+one that cycles all of them suffice.
+
+gi.count_isomorphism, gi.automorphism_order, gi.count_automorphisms and gi.generate_automorphisms
+use count_isomorphism, automorphism_order and generate_automorphisms for forests.
+"""
+
+from math import factorial
+
+from permv2 import permutation
+from partition import adjacency, cached, is_simple
+
+
+def forest(g):
+    """
+    Returns the rooted forest of <g>, or None if <g> is not a forest (it has a cycle, a loop or
+    multiple edges). The rooted forest is a tuple (nbs, trees, children, order): the adjacency
+    lists of the vertex numbers (see partition.adjacency), the list of the roots of every tree (one
+    or two adjacent center vertices), the list of children of every vertex, and a list of all
+    vertices in which every vertex comes after its parent.
+    """
+    return cached(g, '_forest', lambda: _forest(g))
+
+
+def _forest(g):
+    index, nbs = adjacency(g)
+    return _root(nbs) if is_simple(nbs) else None
+
+
+def _root(nbs):
+    """
+    Returns the rooted forest (see forest) of the graph with adjacency lists <nbs>, or None if
+    it has a cycle. The leaves of every tree are removed layer by layer to find its center.
+    """
+    n = len(nbs)
+    seen = [False] * n
+    trees = []
+    for s in range(n):
+        if seen[s]:
+            continue
+        seen[s] = True
+        component = [s]
+        for v in component:
+            for u in nbs[v]:
+                if not seen[u]:
+                    seen[u] = True
+                    component.append(u)
+        if 2 * (len(component) - 1) != sum(len(nbs[v]) for v in component):
+            return None  # a connected graph is a tree iff it has one edge less than vertices
+
+        degree = {}
+        for v in component:
+            degree[v] = len(nbs[v])
+        layer = [v for v in component if degree[v] <= 1]
+        left = len(component)
+        while left > 2:
+            left -= len(layer)
+            next_layer = []
+            for v in layer:
+                for u in nbs[v]:
+                    degree[u] -= 1
+                    if degree[u] == 1:
+                        next_layer.append(u)
+            layer = next_layer
+        trees.append(layer if len(component) > 1 else [s])
+
+    # the roots are their own parents, so that the other center of a tree is not a child
+    parent = [-1] * n
+    children = [[] for v in range(n)]
+    order = []
+    for roots in trees:
+        for r in roots:
+            parent[r] = r
+        order += roots
+    for v in order:
+        for u in nbs[v]:
+            if parent[u] == -1:
+                parent[u] = v
+                children[v].append(u)
+                order.append(u)
+    return nbs, trees, children, order
+
+
+def count_isomorphism(g, h, stop_early=False):
+    """
+    Returns the number of isomorphisms between graphs g and h (with <stop_early>: 1 if there is
+    one, 0 if not) if one of them is a forest, else None.
+    """
+    fg = forest(g)
+    fh = forest(h)
+    if fg is None and fh is None:
+        return None
+    if fg is None or fh is None or len(g._V) != len(h._V):
+        return 0
+
+    codes = {}
+    code_g = _codes(g, fg, codes)
+    code_h = _codes(h, fh, codes)
+    if sorted(_tree_codes(fg, code_g)) != sorted(_tree_codes(fh, code_h)):
+        return 0
+    return 1 if stop_early else _order(fg, code_g)
+
+
+def automorphism_order(g):
+    """
+    Returns the number of automorphisms of <g> if it is a forest, else None.
+    """
+    f = forest(g)
+    if f is None:
+        return None
+    return _order(f, _codes(g, f, {}))
+
+
+def generate_automorphisms(g, x):
+    """
+    Adds generators of the automorphism group of <g> to x if <g> is a forest, as permutations of
+    the labels of its vertices (like gi.generate_automorphisms), and returns True; returns None
+    if <g> is not a forest.
+    """
+    f = forest(g)
+    if f is None:
+        return None
+    nbs, trees, children, order = f
+    code = _codes(g, f, {})
+    labels = [v._label for v in g._V]
+
+    # groups of identical subtrees, each subtree given by the list of its roots
+    groups = []
+    for v in range(len(nbs)):
+        groups += _identical([[c] for c in children[v]], code)
+    for roots in trees:
+        if len(roots) == 2 and code[roots[0]] == code[roots[1]]:
+            groups.append([[roots[0]], [roots[1]]])
+    groups += _identical([sorted(roots, key=lambda r: code[r]) for roots in trees], code)
+
+    for group in groups:
+        cycles = [group[:2]]
+        if len(group) > 2:
+            cycles.append(group)
+        for cycle in cycles:
+            mapping = list(range(len(labels)))
+            for k in range(len(cycle)):
+                for u, w in zip(cycle[k], cycle[(k + 1) % len(cycle)]):
+                    _map(mapping, u, w, code, children, labels)
+            x.append(permutation(len(mapping), mapping=mapping))
+    return True
+
+
+def _codes(g, f, codes):
+    """
+    Returns the code of the rooted subtree of every vertex of the rooted forest <f> of <g>, with
+    the dictionary <codes> from pairs (colornum, sorted codes of the children) to codes.
+    """
+    nbs, trees, children, order = f
+    code = [0] * len(nbs)
+    for v in reversed(order):
+        key = (g._V[v].colornum, tuple(sorted(code[c] for c in children[v])))
+        if key not in codes:
+            codes[key] = len(codes)
+        code[v] = codes[key]
+    return code
+
+
+def _tree_codes(f, code):
+    """
+    Returns the list of codes of the trees of the rooted forest <f>: the code of the center, or
+    the sorted pair of codes of the two halves.
+    """
+    return [tuple(sorted(code[r] for r in roots)) for roots in f[1]]
+
+
+def _order(f, code):
+    """
+    Returns the number of automorphisms of the rooted forest <f> with the codes <code>.
+    """
+    nbs, trees, children, order = f
+    result = 1
+    for v in range(len(nbs)):
+        result *= factorials([code[c] for c in children[v]])
+    for roots in trees:
+        if len(roots) == 2 and code[roots[0]] == code[roots[1]]:
+            result *= 2
+    return result * factorials(_tree_codes(f, code))
+
+
+def factorials(items):
+    """
+    Returns the product of the factorials of the numbers of equal items in the list <items>.
+    """
+    multiplicities = {}
+    for item in items:
+        multiplicities[item] = multiplicities.get(item, 0) + 1
+    result = 1
+    for m in multiplicities.values():
+        result *= factorial(m)
+    return result
+
+
+def _identical(subtrees, code):
+    """
+    Returns the groups of at least two subtrees in the list <subtrees> (lists of roots) with the
+    same codes.
+    """
+    groups = {}
+    for roots in subtrees:
+        key = tuple(code[r] for r in roots)
+        if key in groups:
+            groups[key].append(roots)
+        else:
+            groups[key] = [roots]
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def _map(mapping, u, w, code, children, labels):
+    """
+    Maps the rooted subtree of vertex <u> onto that of vertex <w>, which has the same code, in
+    the list <mapping> of labels: the children of both are matched in the order of their codes.
+    """
+    stack = [(u, w)]
+    while len(stack) > 0:
+        u, w = stack.pop()
+        mapping[labels[u]] = labels[w]
+        stack += zip(sorted(children[u], key=lambda c: code[c]), sorted(children[w], key=lambda c: code[c]))
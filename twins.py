@@ -0,0 +1,170 @@
+"""
+Automorphisms and canonical forms of graphs by their twin classes.
+
+Two vertices with the same colornum are false twins if they have the same neighbours, and true
+twins if they are adjacent and have the same neighbours besides each other. A vertex cannot have
+both true and false twins, so the twins form classes, which every automorphism permutes: the
+transposition of two twins is an automorphism, and every automorphism maps a class onto a class
+of the same size and kind.
+
+The reduced graph has a vertex for every class (the vertices without twins are classes of their
+own), adjacent iff the vertices of the classes are adjacent, colored by the colornum, the size
+and the kind of the class. The colors are the positions of these triples in their sorted list,
+which only depends on the triples that occur, so isomorphic graphs have isomorphic reduced graphs
+with the same colors. The automorphisms of the graph are those of the reduced graph, mapping the
+vertices of a class onto those of its image in their order, combined with all permutations of the
+vertices of every class: so the order of the automorphism group is that of the reduced graph
+times the product of the factorials of the sizes of the classes, and for every class of k twins
+a permutation that swaps the first two of them and (if k > 2) one that cycles all of them are
+added to the generators. The reduced graph may have twins again, which are reduced by its own
+search.
+
+gi.generate_automorphisms (without individualized vertices) and canon.canonical_form use
+generate_automorphisms and canonical_form. The orders are counted by modules.py, in which every
+class of twins is a parallel or series node. Graphs with loops or multiple edges are not reduced.
+"""
+
+import gi
+import canon
+from basicgraphs import graph
+from partition import adjacency, cached, is_simple
+from permv2 import permutation
+
+
+def reduce(g):
+    """
+    Returns a tuple (reduced, classes, weights) for <g>: the reduced graph (vertex j of which is
+    labelled j), the list of the classes of twins (as lists of vertex numbers, see
+    partition.adjacency) in the order of its vertices, and the sorted list of triples (colornum,
+    size, kind) whose positions are the colornums of its vertices, where kind is 1 for true twins
+    and 0 otherwise. Returns None if <g> has no twins, or loops or multiple edges.
+    The result depends on the colors, so it is cached with them, see partition.cached.
+    """
+    return cached(g, '_twins', lambda: _twins(g), colors=True)
+
+
+def _twins(g):
+    index, nbs = adjacency(g)
+    return _reduce(g, nbs) if is_simple(nbs) else None
+
+
+def _reduce(g, nbs):
+    """
+    Returns the result of reduce for <g>, which has the adjacency lists <nbs> and no loops or
+    multiple edges. The twins are found by hashing the sets of (open and closed) neighbours.
+    """
+    n = len(nbs)
+    false_twins = {}
+    true_twins = {}
+    for v in range(n):
+        color = g._V[v].colornum
+        false_key = (color, frozenset(nbs[v]))
+        true_key = (color, frozenset(list(nbs[v]) + [v]))
+        if false_key in false_twins:
+            false_twins[false_key].append(v)
+        else:
+            false_twins[false_key] = [v]
+        if true_key in true_twins:
+            true_twins[true_key].append(v)
+        else:
+            true_twins[true_key] = [v]
+
+    kinds = [0] * n
+    members = [None] * n
+    for kind, groups in ((0, false_twins), (1, true_twins)):
+        for group in groups.values():
+            if len(group) > 1:
+                for v in group:
+                    kinds[v] = kind
+                    members[v] = group
+    if all(m is None for m in members):
+        return None
+
+    classes = []
+    classof = [-1] * n
+    for v in range(n):
+        if classof[v] == -1:
+            group = members[v] if members[v] is not None else [v]
+            for u in group:
+                classof[u] = len(classes)
+            classes.append(group)
+
+    triples = [(g._V[c[0]].colornum, len(c), kinds[c[0]]) for c in classes]
+    weights = sorted(set(triples))
+    position = {}
+    for k in range(len(weights)):
+        position[weights[k]] = k
+
+    pairs = []
+    for a in range(len(classes)):
+        for u in nbs[classes[a][0]]:
+            b = classof[u]
+            if b > a and u == classes[b][0]:
+                pairs.append((a, b))
+    reduced = graph.from_edge_list(len(classes), pairs, simple=True)
+    for a in range(len(classes)):
+        reduced._V[a].colornum = position[triples[a]]
+    return reduced, classes, weights
+
+
+def generate_automorphisms(g, x, firstPruningRule=True, secondPruningRule=True, membershipTesting=False, refine=None, selector=None, orbitPruning=True, jobs=None, budget=None):
+    """
+    Adds generators of the automorphism group of <g> to x if <g> has twins, as permutations of
+    the labels of its vertices (like gi.generate_automorphisms), and returns True; returns None
+    otherwise.
+    The optional arguments are used for the search of the reduced graph, see
+    gi.generate_automorphisms, which is charged to the <budget>.
+    """
+    r = reduce(g)
+    if r is None:
+        return None
+    reduced, classes, weights = r
+    labels = [v._label for v in g._V]
+
+    y = []
+    gi.generate_automorphisms(reduced, reduced.clone(), [], [], y, firstPruningRule, secondPruningRule, membershipTesting, refine, selector, orbitPruning, jobs, budget)
+    for perm in y:
+        mapping = list(range(len(labels)))
+        for a in range(len(classes)):
+            for u, w in zip(classes[a], classes[perm[a]]):
+                mapping[labels[u]] = labels[w]
+        x.append(permutation(len(mapping), mapping=mapping))
+
+    for c in classes:
+        cycles = [c[:2]] if len(c) > 1 else []
+        if len(c) > 2:
+            cycles.append(c)
+        for cycle in cycles:
+            mapping = list(range(len(labels)))
+            for j in range(len(cycle)):
+                mapping[labels[cycle[j]]] = labels[cycle[(j + 1) % len(cycle)]]
+            x.append(permutation(len(mapping), mapping=mapping))
+    return True
+
+
+def canonical_form(g, refine=None, selector=None, budget=None):
+    """
+    Returns the canonical form (labelling, certificate) of <g> (see canon.canonical_form) composed
+    of that of its reduced graph, or None if <g> has no twins: the vertices of every class get
+    consecutive labels, in the order of the canonical labels of the classes. Returns None as
+    well if the <budget> runs out.
+    """
+    r = reduce(g)
+    if r is None:
+        return None
+    reduced, classes, weights = r
+    form = canon.canonical_form(reduced, refine, selector, budget)
+    if form is None:
+        return None
+    reduced_labelling, certificate = form
+
+    by_label = [0] * len(classes)
+    for a in range(len(classes)):
+        by_label[reduced_labelling[a]] = a
+    labelling = [0] * len(g._V)
+    offset = 0
+    for a in by_label:
+        for v in classes[a]:
+            labelling[v] = offset
+            offset += 1
+    return labelling, ('twins', tuple(weights), certificate)
@@ -0,0 +1,141 @@
+"""
+Vectorised color refinement, using NumPy.
+
+recolor_partition(p, queue) refines a partition (see partition.py) to the same stable coloring as
+gi.recolor_partition; it is the 'vector' strategy for the <refine> argument of count_isomorphism,
+generate_automorphisms and count_automorphisms in gi.py and fgi.py.
+
+Instead of building and sorting a list of neighbour colors for every vertex, every round works
+on the CSR adjacency of both graphs together with an integer color array:
+ - every neighbour color is mapped to a 64-bit hash, and the sum of these hashes over the
+   neighbours of each vertex is computed with a single cumulative sum over the CSR array,
+ - the vertices are sorted on (color, hash), and every run of equal keys that does not start
+   a color class gets a new color.
+Equal hashes of different neighbour color multisets are detected when the coloring is stable,
+by comparing the exact (color, count) lists of every vertex with those of the first vertex of
+its color class; in that (very unlikely) case gi.recolor_partition finishes the refinement.
+"""
+# NumPy is optional: the rest of the package works without it.
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def _mix(x):
+    """
+    Returns the splitmix64 hashes of the integers in the NumPy array <x>.
+    """
+    x = x.astype(numpy.uint64) + numpy.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> numpy.uint64(30))) * numpy.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> numpy.uint64(27))) * numpy.uint64(0x94D049BB133111EB)
+    return x ^ (x >> numpy.uint64(31))
+
+
+def _is_exact(col, order, group, sources, targets, k):
+    """
+    Returns True iff all vertices in every group (a run of <order> with the same value in
+    <group>) have exactly the same multiset of neighbour colors.
+    """
+    n = col.size
+    keys, counts = numpy.unique(sources * k + col[targets], return_counts=True)
+    owner = keys // k
+    lengths = numpy.bincount(owner, minlength=n)
+    starts = numpy.concatenate((numpy.zeros(1, dtype=numpy.int64), numpy.cumsum(lengths)[:-1]))
+
+    # the representative of every vertex: the first vertex of its group in <order>
+    first = numpy.ones(n, dtype=bool)
+    first[1:] = group[1:] != group[:-1]
+    rep = numpy.empty(n, dtype=numpy.int64)
+    rep[order] = order[numpy.flatnonzero(first)][numpy.cumsum(first) - 1]
+
+    if (lengths != lengths[rep]).any():
+        return False
+    positions = numpy.arange(keys.size)
+    rep_positions = starts[rep[owner]] + positions - starts[owner]
+    return bool((keys[positions] % k == keys[rep_positions] % k).all() and
+                (counts[positions] == counts[rep_positions]).all())
+
+
+def _refine(col, offsets, sources, targets, k, half=None):
+    """
+    Refines the color array <col>, in which all colors are below <k>, until it is stable.
+    Returns a tuple (col, k, exact), where <exact> is False if equal hashes of different
+    neighbour color multisets were found, or None if a color class with an odd number of
+    vertices is found, or (if <half> is given) a color class with more vertices below <half>
+    than above, so that the refinement traces of the two graphs diverge.
+    """
+    n = col.size
+    while True:
+        if half is None:
+            if (numpy.bincount(col) % 2 == 1).any():
+                return None
+        elif (numpy.bincount(col[:half], minlength=k) != numpy.bincount(col[half:], minlength=k)).any():
+            return None
+
+        sums = numpy.zeros(targets.size + 1, dtype=numpy.uint64)
+        numpy.cumsum(_mix(col[targets]), out=sums[1:])
+        hashes = sums[offsets[1:]] - sums[offsets[:-1]]
+
+        order = numpy.lexsort((hashes, col))
+        sorted_col = col[order]
+        sorted_hash = hashes[order]
+        group_start = numpy.ones(n, dtype=bool)
+        group_start[1:] = (sorted_col[1:] != sorted_col[:-1]) | (sorted_hash[1:] != sorted_hash[:-1])
+        new_color = group_start.copy()
+        new_color[0] = False
+        new_color[1:] &= sorted_col[1:] == sorted_col[:-1]
+
+        if not new_color.any():
+            return col, k, _is_exact(col, order, numpy.cumsum(group_start), sources, targets, k)
+
+        starts = numpy.flatnonzero(group_start)
+        is_new = new_color[starts]
+        group_color = numpy.where(is_new, k + numpy.cumsum(is_new) - 1, sorted_col[starts])
+        col[order] = group_color[numpy.cumsum(group_start) - 1]
+        k += int(is_new.sum())
+
+
+# CSR arrays of the neighbour lists of the last partition that was refined
+_last_nbs = None
+
+
+def recolor_partition(p, queue):
+    """
+    Refines the partition <p> (see partition.py) with vectorised rounds. Every color class of the
+    stable coloring that is not a cell yet is split off the cell that contains it. If p.half is
+    set, this stops after the first round in which a color class becomes unbalanced.
+    :param queue: Ignored: every round looks at all vertices.
+    :return: <False> iff unbalanced coloring is detected;
+     otherwise when done returns <True>, coloring can still be unbalanced.
+    """
+    global _last_nbs
+
+    if numpy is None:
+        raise ImportError('vrecolor.recolor_partition requires NumPy')
+
+    if _last_nbs is None or _last_nbs[0] is not p.nbs:
+        lengths = numpy.array([len(l) for l in p.nbs], dtype=numpy.int64)
+        offsets = numpy.zeros(len(p.nbs) + 1, dtype=numpy.int64)
+        numpy.cumsum(lengths, out=offsets[1:])
+        targets = numpy.array([u for l in p.nbs for u in l], dtype=numpy.int64)
+        sources = numpy.repeat(numpy.arange(len(p.nbs), dtype=numpy.int64), lengths)
+        _last_nbs = (p.nbs, offsets, sources, targets)
+    offsets, sources, targets = _last_nbs[1:]
+
+    old = numpy.array(p.cellof, dtype=numpy.int64)
+    result = _refine(old.copy(), offsets, sources, targets, len(p.start), p.half)
+    if result is None:
+        return False
+
+    col = result[0]
+    changed = numpy.flatnonzero(col != old)
+    if changed.size > 0:
+        new = col.tolist()
+        for c in numpy.unique(old[changed]).tolist():
+            p.split_by(c, new.__getitem__)
+    if not result[2]:
+        import gi
+        return gi.recolor_partition(p, list(range(len(p.start))))
+    return True
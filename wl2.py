@@ -0,0 +1,162 @@
+"""
+2-dimensional Weisfeiler-Leman refinement (2-WL), using NumPy.
+
+Color refinement (1-WL) colors vertices, and cannot distinguish the vertices of e.g. strongly
+regular graphs or CFI graphs, on which the search tree explodes. 2-WL colors pairs of vertices
+instead: the new color of a pair (u, v) is its old color together with the multiset of the
+colors of (u, w) and (w, v) over all vertices w. The colors of the pairs (v, v) then give a
+vertex coloring that is at least as fine as the one of 1-WL, and often much finer.
+
+refinement(refine) returns a refinement strategy (see gi.py) that applies <refine>, and then
+applies 2-WL when cells with many vertices remain; it is used for strategy names that end with
+'+2wl' in gi.get_strategy.
+
+Only the pairs within each graph are colored, not the pairs of a vertex of g and a vertex of h,
+so two graphs with n vertices need two n x n color arrays (of 32-bit integers) instead of one
+2n x 2n array. (A sparse map of pair colors would not be smaller: after the first round, the
+pairs of non-adjacent vertices are split up too.) Colors are numbered for both graphs together,
+and the refinement stops as soon as a color has a different number of pairs in both graphs.
+
+Every round computes, for two sets of random weights x and y of the colors, the sums over w of
+x[color(u, w)] * y[color(w, v)] for all pairs with one matrix product. Equal multisets give equal
+sums, so the coloring never distinguishes pairs that 2-WL does not distinguish; different
+multisets with equal sums (which is very unlikely) only make the coloring coarser.
+
+This is expensive: every round takes four n x n matrix products, O(n^3) time, and about 70 bytes
+per pair (the colors, the weight matrices, the 64-bit sums and the sorting), and it is done again
+from scratch at every search node that still has a cell with many vertices. So graphs with more
+than MAX_VERTICES vertices are not refined with 2-WL; at that size a refinement takes about a
+second and 35 MB.
+"""
+# NumPy is optional: the rest of the package works without it.
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# the products of the weights are summed exactly in floating point if n * WEIGHT**2 < 2**53
+WEIGHT = 1 << 20
+MAX_VERTICES = 512
+
+
+# adjacency matrices of the last partition that was refined, see _adjacency_matrices
+_last_nbs = None
+
+
+def _adjacency_matrices(nbs, half):
+    """
+    Returns the adjacency matrices (with the number of edges between every two vertices) of
+    the graph on vertices 0...half-1 and of the graph on the other vertices, where nbs[v] is the
+    list of neighbours of vertex v.
+    """
+    global _last_nbs
+
+    if _last_nbs is None or _last_nbs[0] is not nbs or _last_nbs[1] != half:
+        matrices = []
+        for first, last in ((0, half), (half, len(nbs))):
+            A = numpy.zeros((last - first, last - first), dtype=numpy.int32)
+            sources = []
+            targets = []
+            for v in range(first, last):
+                for u in nbs[v]:
+                    sources.append(v - first)
+                    targets.append(u - first)
+            numpy.add.at(A, (numpy.array(sources, dtype=numpy.int64), numpy.array(targets, dtype=numpy.int64)), 1)
+            matrices.append(A)
+        _last_nbs = (nbs, half, matrices)
+    return _last_nbs[2]
+
+
+def _renumber(*columns):
+    """
+    Returns for the tuples of the entries of the integer arrays <columns> (of equal length) at
+    every position their ranks among the distinct tuples, as 32-bit integers, and the number of
+    distinct tuples.
+    """
+    order = numpy.lexsort(columns[::-1])
+    first = numpy.zeros(len(order), dtype=bool)
+    first[0] = True
+    for column in columns:
+        sorted_column = column[order]
+        first[1:] |= sorted_column[1:] != sorted_column[:-1]
+    ranks = numpy.empty(len(order), dtype=numpy.int32)
+    ranks[order] = numpy.cumsum(first, dtype=numpy.int32) - 1
+    return ranks, int(first.sum())
+
+
+def refine_pairs(nbs, colors, half):
+    """
+    Applies 2-WL to the graph on the vertices 0...half-1 and the graph on the other vertices
+    together, where nbs[v] is the list of neighbours of vertex v and colors[v] is the initial
+    color of vertex v.
+    Returns for every vertex its color in the stable coloring (the color of the pair (v, v)),
+    numbered in the same way for both graphs, or None if the colorings of the graphs differ.
+    """
+    n = len(nbs) - half
+    if n != half:
+        return None
+    if n == 0:
+        return []
+
+    A, B = _adjacency_matrices(nbs, half)
+    colors = numpy.array(colors, dtype=numpy.int32)
+    offset = max(int(A.max()), int(B.max())) + 1
+    diagonal = numpy.eye(n, dtype=bool)
+    size = n * n
+
+    # initial pair colors: the number of edges, or the vertex color for the pairs (v, v)
+    keys = numpy.concatenate((numpy.where(diagonal, offset + colors[:n, None], A).ravel(),
+                              numpy.where(diagonal, offset + colors[n:, None], B).ravel()))
+    ranks, k = _renumber(keys)
+    random = numpy.random.RandomState(1)
+    while True:
+        if (numpy.bincount(ranks[:size], minlength=k) != numpy.bincount(ranks[size:], minlength=k)).any():
+            return None
+
+        sums = []
+        for weights in range(2):
+            x = random.randint(1, WEIGHT, size=k).astype(numpy.float64)
+            y = random.randint(1, WEIGHT, size=k).astype(numpy.float64)
+            parts = []
+            for C in (ranks[:size].reshape(n, n), ranks[size:].reshape(n, n)):
+                parts.append(numpy.dot(x[C], y[C]).ravel().astype(numpy.int64))
+            sums.append(numpy.concatenate(parts))
+
+        ranks, new_k = _renumber(ranks, sums[0], sums[1])
+        if new_k == k:
+            break
+        k = new_k
+
+    return numpy.concatenate((ranks[:size].reshape(n, n).diagonal(),
+                              ranks[size:].reshape(n, n).diagonal())).tolist()
+
+
+def refinement(refine, min_cell=8):
+    """
+    Returns a refinement strategy that refines a partition <p> (see partition.py) with <refine>
+    and then, if p.half is set and a cell contains at least <min_cell> vertices of both graphs,
+    splits the cells according to the vertex colors of 2-WL and refines again.
+    Graphs with more than MAX_VERTICES vertices are only refined with <refine>.
+    """
+    if numpy is None:
+        raise ImportError('wl2.refinement requires NumPy')
+
+    def refine_2wl(p, queue):
+        if not refine(p, queue):
+            return False
+        if p.half is None or p.half > MAX_VERTICES or \
+                max(p.end[c] - p.start[c] for c in range(len(p.start))) < 2 * min_cell:
+            return True
+
+        colors = refine_pairs(p.nbs, p.cellof, p.half)
+        if colors is None:
+            return False
+
+        new = []
+        for c in range(len(p.start)):
+            if p.end[c] - p.start[c] > 2:
+                new += p.split_by(c, colors.__getitem__)
+        return len(new) == 0 or refine(p, new)
+
+    return refine_2wl